@@ -0,0 +1,3 @@
+"""
+QAEWO Backend package
+"""
@@ -4,27 +4,238 @@ Quantum Annealing + Whale Optimization for Route Optimization
 """
 
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import numpy as np
 import json
 import sys
 import os
-import traceback
+import logging
+import time
+import threading
+import uuid
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Add quantum directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'quantum'))
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson: compact output, NumPy arrays/scalars supported"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+if MSGSPEC_AVAILABLE:
+    class Waypoint(msgspec.Struct):
+        """A route location as sent by the frontend"""
+        lat: float
+        lng: float
+        name: Optional[str] = None
+        address: Optional[str] = None
+    
+    class OptimizeRequest(msgspec.Struct):
+        """Body of /api/optimize-route"""
+        waypoints: List[Waypoint] = []
+
+
+def _parse_waypoints(body: bytes) -> List[dict]:
+    """
+    Decode and validate the optimize-route body in one pass
+    Returns waypoints as plain dicts with float lat/lng (name/address only when given)
+    Raises ValueError on malformed JSON or waypoints
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            req = msgspec.json.decode(body, type=OptimizeRequest)
+        except msgspec.MsgspecError as e:
+            raise ValueError(str(e)) from e
+        waypoints = []
+        for w in req.waypoints:
+            waypoint = {'lat': w.lat, 'lng': w.lng}
+            if w.name is not None:
+                waypoint['name'] = w.name
+            if w.address is not None:
+                waypoint['address'] = w.address
+            waypoints.append(waypoint)
+        return waypoints
+    
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get('waypoints', []), list):
+        raise ValueError("Expected an object with a 'waypoints' array")
+    
+    waypoints = []
+    for i, w in enumerate(data.get('waypoints', [])):
+        try:
+            waypoint = {'lat': float(w['lat']), 'lng': float(w['lng'])}
+        except (TypeError, KeyError, ValueError) as e:
+            raise ValueError(f"Waypoint {i} needs numeric 'lat' and 'lng'") from e
+        for key in ('name', 'address'):
+            if w.get(key) is not None:
+                waypoint[key] = w[key]
+        waypoints.append(waypoint)
+    return waypoints
+
+
 app = Flask(__name__)
 CORS(app)
 
-# Configure Flask
-app.config['JSON_SORT_KEYS'] = False
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+# Request tracing is DEBUG-level; set LOG_LEVEL=DEBUG to see it
+logger = app.logger
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+# Configure Flask: compact, insertion-ordered JSON (responses are machine-consumed)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
+app.json.sort_keys = False
+app.json.compact = True
+
+# Compress large responses (route geometries), Brotli preferred over gzip
+if COMPRESS_AVAILABLE:
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    Compress(app)
+
+# Real-routing optimizer classes and per-API-key routers, created on first use
+# and reused by every later request handled by this process
+_HYBRID = None
+_ROUTERS = {}
+
+
+def _get_hybrid():
+    """Return (HybridQuantumWhaleOptimizer, RealWorldRouteOptimizer), importing them once"""
+    global _HYBRID
+    if _HYBRID is None:
+        from hybrid_optimizer import HybridQuantumWhaleOptimizer
+        from real_world_routing import RealWorldRouteOptimizer
+        _HYBRID = (HybridQuantumWhaleOptimizer, RealWorldRouteOptimizer)
+    return _HYBRID
+
+
+def _get_route_optimizer(api_key: str):
+    """Return the process-wide RealWorldRouteOptimizer for this API key"""
+    route_optimizer = _ROUTERS.get(api_key)
+    if route_optimizer is None:
+        _, RealWorldRouteOptimizer = _get_hybrid()
+        route_optimizer = _ROUTERS[api_key] = RealWorldRouteOptimizer(api_key=api_key)
+    return route_optimizer
+
+
+def _geometry(coords: np.ndarray, path: List[int]):
+    """Route geometry ([lat, lng] rows along path); orjson serializes the array as-is"""
+    geometry = coords[path]
+    return geometry if ORJSON_AVAILABLE else geometry.tolist()
+
+
+# Colors for alternative routes, in display order
+_ROUTE_COLORS = ['#3b82f6', '#ef4444', '#f97316', '#14b8a6', '#a855f7', '#ec4899', '#f59e0b']
+
+
+def _two_point_fast(start_point: dict, destination: dict, route_optimizer) -> dict:
+    """
+    Start + Destination only: the order is trivially [0, 1], so skip the
+    optimizer entirely and fetch road alternatives with one ORS directions call
+    """
+    start_time = time.time()
+    alternatives = route_optimizer.get_alternative_routes(start_point, destination, max_alternatives=3)
+    
+    # Shortest first; distinct roads only (same rounded distance = same road)
+    alt_routes = []
+    seen_distances = set()
+    for distance, route_info in sorted(alternatives, key=lambda alt: alt[0]):
+        rounded_dist = round(distance, 1)
+        if rounded_dist in seen_distances:
+            continue
+        seen_distances.add(rounded_dist)
+        
+        i = len(alt_routes)
+        geometry = [[coord[1], coord[0]] for coord in route_info['geometry']]  # Swap to lat,lng
+        alt_routes.append({
+            'name': f'Route Option {i+1}' if i > 0 else 'Fastest Route',
+            'path': [0, 1],
+            'distance': float(distance),
+            'duration': float(route_info['duration']),
+            'geometry': geometry,
+            'segments': [{
+                'from': {'name': start_point.get('name', 'Start'), 'coordinates': {'lat': start_point['lat'], 'lng': start_point['lng']}},
+                'to': {'name': destination.get('name', 'End'), 'coordinates': {'lat': destination['lat'], 'lng': destination['lng']}},
+                'distance_km': float(distance),
+                'duration_minutes': float(route_info['duration']),
+                'geometry': geometry
+            }],
+            'color': _ROUTE_COLORS[i % len(_ROUTE_COLORS)]
+        })
+    
+    best_route = alt_routes[0]
+    return {
+        'optimized_order': [0, 1],
+        'total_distance': best_route['distance'],
+        'total_duration': best_route['duration'],
+        'route_geometry': best_route['geometry'],
+        'segments': best_route['segments'],
+        'optimization_method': 'hybrid',
+        'optimization_time': time.time() - start_time,
+        'quantum_iterations': 0,
+        'woa_iterations': 0,
+        'alternative_routes': alt_routes,
+        'optimization_phases': []
+    }
+
+
+# Background optimization jobs (opt-in per request for large inputs). Jobs run
+# in this process; finished results are kept for polling until MAX_JOBS newer
+# jobs have been submitted
+ASYNC_MIN_WAYPOINTS = int(os.environ.get('ASYNC_MIN_WAYPOINTS', 5))
+MAX_JOBS = 256
+_JOB_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get('JOB_WORKERS', 2)))
+_JOBS = {}
+_JOBS_LOCK = threading.Lock()
+
+
+def _submit_job(waypoints: List[dict], api_key: Optional[str]) -> str:
+    """Queue an optimization and return its job id"""
+    job_id = uuid.uuid4().hex
+    future = _JOB_EXECUTOR.submit(_optimize_waypoints, waypoints, api_key)
+    with _JOBS_LOCK:
+        _JOBS[job_id] = future
+        # Evict the oldest jobs (dicts keep insertion order)
+        while len(_JOBS) > MAX_JOBS:
+            del _JOBS[next(iter(_JOBS))]
+    return job_id
+
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -42,90 +253,71 @@ def health_check():
         'version': '2.0.0',
         'endpoints': {
             'health': '/api/health',
-            'optimize': '/api/optimize-route'
+            'optimize': '/api/optimize-route',
+            'job': '/api/job/<job_id>'
         }
     })
 
-@app.route('/api/optimize-route', methods=['POST'])
-def optimize_route():
+
+def _optimize_waypoints(waypoints: List[dict], api_key: Optional[str]) -> Tuple[dict, int]:
     """
-    Route Optimization Endpoint
-    Handles two scenarios:
-    1. Start + Destination only (2 waypoints): Find alternative routes
-    2. Start + Waypoints + Destination (3+): Optimize route through waypoints
+    Optimize already-validated waypoints: hybrid optimizer with real routing when
+    an ORS key is available, basic (Haversine) optimizer otherwise or on failure
+    Returns (response body, HTTP status); shared by the endpoint and background jobs
     """
     try:
-        data = request.get_json()
-        waypoints = data.get('waypoints', [])
-        
-        if not waypoints or len(waypoints) < 2:
-            return jsonify({
-                'success': False,
-                'error': 'At least 2 locations required (Start and Destination)'
-            }), 400
-        
-        # Get API key from environment
-        api_key = os.environ.get('ORS_API_KEY')
-        
         num_waypoints = len(waypoints)
+        # (N, 2) lat/lng rows; route geometries and the Haversine matrix read from it
+        coords = np.array([[w['lat'], w['lng']] for w in waypoints], dtype=np.float64)
         start_point = waypoints[0]
         destination = waypoints[-1]
         intermediate_waypoints = waypoints[1:-1] if num_waypoints > 2 else []
         
-        print(f"\n{'='*60}")
-        print(f"Route Request:")
-        print(f"  Start: {start_point.get('name')}")
-        if intermediate_waypoints:
-            print(f"  Waypoints: {[w.get('name') for w in intermediate_waypoints]}")
-        print(f"  Destination: {destination.get('name')}")
-        print(f"{'='*60}\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Route request: start=%s waypoints=%s destination=%s",
+                         start_point.get('name'),
+                         [w.get('name') for w in intermediate_waypoints],
+                         destination.get('name'))
         
         # Try hybrid optimizer first (with real routing)
         if api_key:
             try:
-                from hybrid_optimizer import HybridQuantumWhaleOptimizer
-                from real_world_routing import RealWorldRouteOptimizer
+                HybridQuantumWhaleOptimizer, _ = _get_hybrid()
                 
-                # Initialize route optimizer
-                route_optimizer = RealWorldRouteOptimizer(api_key=api_key)
+                # Shared route optimizer (keeps its route cache across requests)
+                route_optimizer = _get_route_optimizer(api_key)
                 
                 # Scenario 1: Only Start and Destination (2 points) - Find alternative routes
                 if num_waypoints == 2:
-                    print(f"Finding alternative routes from {start_point.get('name')} to {destination.get('name')}...")
+                    logger.debug("Finding alternative routes from %s to %s",
+                                 start_point.get('name'), destination.get('name'))
                     
-                    # Use the HybridQuantumWhaleOptimizer which handles 2-waypoint alternatives
-                    distance_matrix, route_details_matrix = route_optimizer.calculate_distance_matrix_real(waypoints)
-                    
-                    optimizer = HybridQuantumWhaleOptimizer(distance_matrix, waypoints, api_key=api_key)
-                    optimizer.route_optimizer = route_optimizer
-                    optimizer.route_details_matrix = route_details_matrix
-                    optimizer.fixed_start = True  # Keep start fixed
-                    optimizer.fixed_end = True    # Keep end fixed
-                    
-                    result = optimizer.optimize()
+                    return {
+                        'success': True,
+                        'data': _two_point_fast(start_point, destination, route_optimizer),
+                        'mode': 'hybrid_quantum_whale_real_routing'
+                    }, 200
                 
                 # Scenario 2: Start + Waypoints + Destination (3+ points) - Optimize intermediate waypoints only
-                else:
-                    print(f"Optimizing route with {len(intermediate_waypoints)} intermediate waypoints...")
-                    print(f"Start and destination are FIXED - only optimizing waypoint order")
-                    
-                    # Calculate distance matrix with real routing for all points
-                    distance_matrix, route_details_matrix = route_optimizer.calculate_distance_matrix_real(waypoints)
-                    
-                    # Run hybrid optimization with fixed start and end
-                    optimizer = HybridQuantumWhaleOptimizer(distance_matrix, waypoints, api_key=api_key)
-                    optimizer.route_optimizer = route_optimizer
-                    optimizer.route_details_matrix = route_details_matrix
-                    optimizer.fixed_start = True  # Keep start (index 0) fixed
-                    optimizer.fixed_end = True    # Keep destination (index n-1) fixed
-                    
-                    result = optimizer.optimize()
+                logger.debug("Optimizing route with %d intermediate waypoints (start and destination fixed)",
+                             len(intermediate_waypoints))
+                
+                # Calculate distance matrix with real routing for all points
+                distance_matrix, route_details_matrix = route_optimizer.calculate_distance_matrix_real(waypoints)
+                
+                # Run hybrid optimization with fixed start and end
+                optimizer = HybridQuantumWhaleOptimizer(distance_matrix, waypoints)
+                optimizer.route_optimizer = route_optimizer
+                optimizer.route_details_matrix = route_details_matrix
+                optimizer.fixed_start = True  # Keep start (index 0) fixed
+                optimizer.fixed_end = True    # Keep destination (index n-1) fixed
+                
+                result = optimizer.optimize()
                 
                 # Enhance response with clear structure
                 alt_routes = result.get('alternative_routes', [])
-                print(f"\n=== SENDING TO FRONTEND ===")
-                print(f"Alternative routes order: {[(r['name'], r['distance']) for r in alt_routes]}")
-                print(f"===========================\n")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Alternative routes order: %s", [(r['name'], r['distance']) for r in alt_routes])
                 
                 # Use data from the best route (first in alternative_routes after sorting)
                 best_route = alt_routes[0] if alt_routes else None
@@ -136,13 +328,14 @@ def optimize_route():
                 
                 # Ensure order is correct: start (0) should come first
                 if optimized_order and optimized_order[0] != 0:
-                    print(f"WARNING: Path starts with {optimized_order[0]}, correcting to start from 0")
+                    logger.warning("Path starts with %s, correcting to start from 0", optimized_order[0])
                     # For 2-waypoint, should always be [0, 1]
                     if len(optimized_order) == 2:
                         optimized_order = [0, 1]
                 
-                print(f"Final optimized_order: {optimized_order}")
-                print(f"Waypoint names in order: {[waypoints[i]['name'] for i in optimized_order]}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Final optimized_order: %s (%s)", optimized_order,
+                                 [waypoints[i].get('name') for i in optimized_order])
                 
                 response_data = {
                     'optimized_order': optimized_order,
@@ -158,135 +351,119 @@ def optimize_route():
                     'optimization_phases': result.get('optimization_phases', [])
                 }
                 
-                return jsonify({
+                return {
                     'success': True,
                     'data': response_data,
                     'mode': 'hybrid_quantum_whale_real_routing'
-                })
+                }, 200
                 
             except requests.exceptions.HTTPError as e:
                 # Handle specific API errors
                 error_msg = str(e)
                 if '2099' in error_msg or 'not found' in error_msg.lower():
-                    return jsonify({
+                    return {
                         'success': False,
                         'error': 'Route not possible: Locations may not be connected by roads (e.g., across ocean). Please select locations on the same landmass.'
-                    }), 400
+                    }, 400
                 elif '2004' in error_msg:
-                    return jsonify({
+                    return {
                         'success': False,
                         'error': 'Route is too long for alternative route calculation. System will retry with different strategy.'
-                    }), 400
+                    }, 400
                 else:
-                    print(f"API Error: {e}")
-                    print(traceback.format_exc())
-                    return jsonify({
-                        'success': False,
-                        'error': f'Routing API error: {str(e)}'
-                    }), 500
+                    # Rate limited / upstream down even after retries, or rejected
+                    # (e.g. bad key): routing cannot help, use the basic optimizer
+                    logger.exception("API Error: %s", e)
             except Exception as e:
-                print(f"Hybrid optimizer error: {e}")
-                print(traceback.format_exc())
+                logger.exception("Hybrid optimizer error: %s", e)
                 # Fall through to basic optimizer
         
         # Fallback to basic route optimizer (Haversine distances)
         try:
-            from route_optimizer import HybridRouteOptimizer
+            from route_optimizer import HybridRouteOptimizer, NUMBA_AVAILABLE, nn_path
             
-            print(f"Using basic route optimizer with Quantum Annealing for {len(waypoints)} waypoints...")
+            logger.debug("Using basic route optimizer with Quantum Annealing for %d waypoints", len(waypoints))
             optimizer = HybridRouteOptimizer()
             result = optimizer.optimize(waypoints, use_quantum=True)
             
             # The basic optimizer returns best_route_index, not a full path
             # Create a simple ordered path based on nearest neighbor
             n = len(waypoints)
-            if n == 2:
-                # Simple 2-point route
-                best_path = [0, 1]
+            
+            # The optimizer's own (memoized) distance matrix; path, segments and alternatives all index into it
+            dist_matrix = optimizer._calculate_distance_matrix(waypoints)
+            
+            if NUMBA_AVAILABLE:
+                best_path = nn_path(dist_matrix).tolist()
             else:
-                # Use nearest neighbor heuristic for path
-                visited = [False] * n
+                unvisited = np.ones(n, dtype=bool)
+                unvisited[0] = False
                 best_path = [0]  # Start at first waypoint
-                visited[0] = True
                 
                 for _ in range(n - 1):
-                    current = best_path[-1]
-                    nearest_dist = float('inf')
-                    nearest_idx = -1
-                    
-                    for j in range(n):
-                        if not visited[j]:
-                            dist = optimizer._haversine(waypoints[current], waypoints[j])
-                            if dist < nearest_dist:
-                                nearest_dist = dist
-                                nearest_idx = j
-                    
-                    if nearest_idx != -1:
-                        best_path.append(nearest_idx)
-                        visited[nearest_idx] = True
+                    nearest_idx = int(np.argmin(np.where(unvisited, dist_matrix[best_path[-1]], np.inf)))
+                    best_path.append(nearest_idx)
+                    unvisited[nearest_idx] = False
+            
+            def tour_cost(path):
+                return float(dist_matrix[path[:-1], path[1:]].sum())
             
-            # Calculate total distance for the path
-            total_dist = 0
-            for i in range(len(best_path) - 1):
-                total_dist += optimizer._haversine(waypoints[best_path[i]], waypoints[best_path[i + 1]])
+            # Segment and total distances for the path
+            from_indices, to_indices = best_path[:-1], best_path[1:]
+            seg_dists = dist_matrix[from_indices, to_indices]
+            seg_durations = seg_dists / 40 * 60  # 40 km/h average speed
+            total_dist = float(seg_dists.sum())
+            best_geometry = _geometry(coords, best_path)
             
-            # Create segments
-            segments = []
-            for i in range(len(best_path) - 1):
-                from_idx = best_path[i]
-                to_idx = best_path[i + 1]
-                dist = optimizer._haversine(waypoints[from_idx], waypoints[to_idx])
-                segments.append({
-                    'from': {
-                        'index': from_idx,
-                        'name': waypoints[from_idx].get('name', f'Point {from_idx + 1}'),
-                        'coordinates': {'lat': waypoints[from_idx]['lat'], 'lng': waypoints[from_idx]['lng']}
-                    },
-                    'to': {
-                        'index': to_idx,
-                        'name': waypoints[to_idx].get('name', f'Point {to_idx + 1}'),
-                        'coordinates': {'lat': waypoints[to_idx]['lat'], 'lng': waypoints[to_idx]['lng']}
-                    },
+            # Create segments (names and coordinates resolved once per waypoint)
+            names = [w.get('name', f'Point {i + 1}') for i, w in enumerate(waypoints)]
+            coordinates = [{'lat': w['lat'], 'lng': w['lng']} for w in waypoints]
+            segments = [
+                {
+                    'from': {'index': from_idx, 'name': names[from_idx], 'coordinates': coordinates[from_idx]},
+                    'to': {'index': to_idx, 'name': names[to_idx], 'coordinates': coordinates[to_idx]},
                     'distance_km': float(dist),
-                    'duration_minutes': float(dist / 40 * 60)  # 40 km/h average speed
-                })
+                    'duration_minutes': float(duration)
+                }
+                for from_idx, to_idx, dist, duration in zip(from_indices, to_indices, seg_dists, seg_durations)
+            ]
             
-            # Create alternative routes from optimization phases
+            # Create alternative routes from optimization phases. Every variation is
+            # either the best path or the same swap of it, so each is costed only once
+            variations = {False: (best_path, total_dist, best_geometry)}
             alternative_routes = []
             for phase in result.get('optimization_phases', []):
                 # For basic optimizer, create variations of the path
-                alt_path = best_path.copy()
-                if len(alt_path) > 2 and phase['name'] != 'Local Search':
-                    # Create a different route variation
+                swapped = len(best_path) > 2 and phase['name'] != 'Local Search'
+                if swapped not in variations:
+                    alt_path = best_path.copy()
                     alt_path[1], alt_path[-1] = alt_path[-1], alt_path[1]  # Swap waypoints
-                
-                alt_dist = 0
-                for i in range(len(alt_path) - 1):
-                    alt_dist += optimizer._haversine(waypoints[alt_path[i]], waypoints[alt_path[i + 1]])
+                    variations[swapped] = (alt_path, tour_cost(alt_path), _geometry(coords, alt_path))
+                alt_path, alt_dist, alt_geometry = variations[swapped]
                 
                 alternative_routes.append({
                     'name': phase['name'],
                     'path': alt_path,
-                    'distance': float(alt_dist),
-                    'duration': float(alt_dist / 40 * 60),  # 40 km/h
-                    'geometry': [[waypoints[i]['lat'], waypoints[i]['lng']] for i in alt_path]
+                    'distance': alt_dist,
+                    'duration': alt_dist / 40 * 60,  # 40 km/h
+                    'geometry': alt_geometry
                 })
             
             # Add the final optimized route as the best
             alternative_routes.append({
                 'name': 'Final Optimized Route',
                 'path': best_path,
-                'distance': float(total_dist),
-                'duration': float(total_dist / 40 * 60),  # 40 km/h
-                'geometry': [[waypoints[i]['lat'], waypoints[i]['lng']] for i in best_path]
+                'distance': total_dist,
+                'duration': total_dist / 40 * 60,  # 40 km/h
+                'geometry': best_geometry
             })
             
             # Format result to match expected structure
             formatted_result = {
                 'optimized_order': best_path,
-                'total_distance': float(total_dist),
-                'total_duration': float(total_dist / 40 * 60),  # 40 km/h average speed
-                'route_geometry': [[waypoints[i]['lat'], waypoints[i]['lng']] for i in best_path],
+                'total_distance': total_dist,
+                'total_duration': total_dist / 40 * 60,  # 40 km/h average speed
+                'route_geometry': best_geometry,
                 'segments': segments,
                 'optimization_method': 'quantum_annealing' if any('Quantum' in p['name'] for p in result.get('optimization_phases', [])) else 'hybrid',
                 'optimization_time': 0.1,
@@ -296,29 +473,95 @@ def optimize_route():
                 'optimization_phases': result.get('optimization_phases', [])
             }
             
-            return jsonify({
+            return {
                 'success': True,
                 'data': formatted_result,
                 'mode': 'basic_optimization'
-            })
+            }, 200
             
         except Exception as e:
-            print(f"Basic optimizer error: {e}")
-            print(traceback.format_exc())
-            return jsonify({
+            logger.exception("Basic optimizer error: %s", e)
+            return {
                 'success': False,
                 'error': 'Optimization failed',
                 'details': str(e)
-            }), 500
+            }, 500
             
     except Exception as e:
-        print(f"Request error: {e}")
-        print(traceback.format_exc())
-        return jsonify({
+        logger.exception("Request error: %s", e)
+        return {
             'success': False,
             'error': 'Invalid request',
             'details': str(e)
+        }, 400
+
+
+@app.route('/api/optimize-route', methods=['POST'])
+def optimize_route():
+    """
+    Route Optimization Endpoint
+    Handles two scenarios:
+    1. Start + Destination only (2 waypoints): Find alternative routes
+    2. Start + Waypoints + Destination (3+): Optimize route through waypoints
+    
+    With ?async=1 and more than ASYNC_MIN_WAYPOINTS locations the optimization
+    runs as a background job: responds 202 with a job_id to poll at /api/job/<id>
+    """
+    try:
+        waypoints = _parse_waypoints(request.get_data())
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid request: {e}'
         }), 400
+    
+    if not waypoints or len(waypoints) < 2:
+        return jsonify({
+            'success': False,
+            'error': 'At least 2 locations required (Start and Destination)'
+        }), 400
+    
+    # Get API key from environment
+    api_key = os.environ.get('ORS_API_KEY')
+    
+    if len(waypoints) > ASYNC_MIN_WAYPOINTS and request.args.get('async', '').lower() in ('1', 'true'):
+        job_id = _submit_job(waypoints, api_key)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'pending',
+            'poll_url': f'/api/job/{job_id}'
+        }), 202
+    
+    body, status = _optimize_waypoints(waypoints, api_key)
+    return jsonify(body), status
+
+
+@app.route('/api/job/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Background optimization job status
+    Pending jobs answer 202; finished jobs return the optimize-route response
+    """
+    with _JOBS_LOCK:
+        future = _JOBS.get(job_id)
+    
+    if future is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown or expired job'
+        }), 404
+    
+    if not future.done():
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'running' if future.running() else 'pending'
+        }), 202
+    
+    body, status = future.result()
+    return jsonify(dict(body, job_id=job_id, status='done')), status
+
 
 @app.route('/api/calculate-distance', methods=['POST'])
 def calculate_distance():
@@ -339,8 +582,7 @@ def calculate_distance():
         api_key = os.environ.get('ORS_API_KEY')
         
         if api_key:
-            from real_world_routing import RealWorldRouteOptimizer
-            route_optimizer = RealWorldRouteOptimizer(api_key=api_key)
+            route_optimizer = _get_route_optimizer(api_key)
             distance, route_info = route_optimizer.get_real_distance(point1, point2)
             
             return jsonify({
@@ -362,7 +604,7 @@ def calculate_distance():
             })
             
     except Exception as e:
-        print(f"Distance calculation error: {e}")
+        logger.error("Distance calculation error: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1,19 +1,156 @@
 import numpy as np
 import json
+import logging
 import math
 import sys
 import os
 import time
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Dict, Optional, Tuple
 from real_world_routing import RealWorldRouteOptimizer, TSPSolver
 
+logger = logging.getLogger(__name__)
+
+# Max memoized path lengths per optimizer (oldest entries evicted first)
+PATH_DISTANCE_CACHE_SIZE = 100_000
+
+# Largest problem solved exactly (Held-Karp, O(n²·2ⁿ)) instead of heuristically
+EXACT_SEARCH_MAX_WAYPOINTS = 12
+
+# Nearest neighbors per city considered by 2-opt; smaller problems scan every pair
+TWO_OPT_NEIGHBORS = 15
+
+# Double-bridge kicks per random-restart alternative (each followed by 2-opt)
+RESTART_KICKS = 20
+
 try:
     from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
+    from qiskit.circuit import Parameter
     from qiskit_aer import AerSimulator
     QISKIT_AVAILABLE = True
 except ImportError:
     QISKIT_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in so JIT-decorated helpers still import without Numba"""
+        return lambda func: func
+
+
+@njit(cache=True)
+def _farthest_insertion_nb(dm: np.ndarray) -> np.ndarray:
+    """
+    Farthest insertion over a distance matrix, compiled with Numba
+    Output: the tour as an int64 array (same tour as the NumPy fallback)
+    """
+    n = dm.shape[0]
+    
+    # Start with two farthest cities (first maximum over the upper triangle)
+    start_i, start_j = 0, 1
+    max_dist = -1.0
+    for i in range(n):
+        for j in range(i + 1, n):
+            if dm[i, j] > max_dist:
+                max_dist = dm[i, j]
+                start_i, start_j = i, j
+    
+    tour = np.empty(n, np.int64)
+    tour[0] = start_i
+    tour[1] = start_j
+    tour_len = 2
+    in_tour = np.zeros(n, np.bool_)
+    in_tour[start_i] = True
+    in_tour[start_j] = True
+    min_to_tour = np.empty(n)
+    for c in range(n):
+        min_to_tour[c] = min(dm[c, start_i], dm[c, start_j])
+    
+    for _ in range(n - 2):
+        # Find farthest city from tour
+        farthest_city = -1
+        max_min_dist = -np.inf
+        for c in range(n):
+            if not in_tour[c] and min_to_tour[c] > max_min_dist:
+                max_min_dist = min_to_tour[c]
+                farthest_city = c
+        
+        # Find best insertion position
+        best_pos = 0
+        best_cost = np.inf
+        for pos in range(tour_len):
+            next_pos = (pos + 1) % tour_len
+            cost = (dm[tour[pos], farthest_city] + dm[farthest_city, tour[next_pos]]
+                    - dm[tour[pos], tour[next_pos]])
+            if cost < best_cost:
+                best_cost = cost
+                best_pos = next_pos
+        
+        # Shift the tail right by one and insert
+        for k in range(tour_len, best_pos, -1):
+            tour[k] = tour[k - 1]
+        tour[best_pos] = farthest_city
+        tour_len += 1
+        
+        in_tour[farthest_city] = True
+        for c in range(n):
+            if dm[c, farthest_city] < min_to_tour[c]:
+                min_to_tour[c] = dm[c, farthest_city]
+    
+    return tour
+
+
+if NUMBA_AVAILABLE:
+    # Compile (or load from cache) at import so the first request doesn't pay for it
+    _farthest_insertion_nb(np.zeros((3, 3)))
+
+
+@lru_cache(maxsize=None)
+def _qa_simulator():
+    """Shared Aer simulator for the quantum annealing phase"""
+    return AerSimulator()
+
+
+@lru_cache(maxsize=None)
+def _qa_ansatz(num_qubits: int):
+    """
+    Annealing ansatz with the rotation angle as a Parameter, transpiled once per
+    qubit count. Returns (theta, transpiled circuit); bind theta per iteration.
+    """
+    theta = Parameter('θ')
+    qr = QuantumRegister(num_qubits, 'q')
+    cr = ClassicalRegister(num_qubits, 'c')
+    qc = QuantumCircuit(qr, cr)
+    
+    # Hadamard superposition, then the problem-dependent ansatz (whole-register gates)
+    qc.h(qr)
+    qc.rx(theta, qr)
+    
+    # Entanglement
+    for i in range(num_qubits - 1):
+        qc.cx(qr[i], qr[i + 1])
+    
+    # Phase rotation and measurement
+    qc.rz(theta * 0.5, qr)
+    qc.measure(qr, cr)
+    
+    return theta, transpile(qc, _qa_simulator(), optimization_level=0)
+
+
+# Alternative route colors: Blue, Red, Orange, Teal, Purple, Pink, Amber
+_COLORS = ('#3b82f6', '#ef4444', '#f97316', '#14b8a6', '#a855f7', '#ec4899', '#f59e0b')
+
 
 class HybridQuantumWhaleOptimizer:
     """
@@ -26,14 +163,15 @@ class HybridQuantumWhaleOptimizer:
     """
     
     def __init__(self, distance_matrix: np.ndarray, waypoints: List[Dict], api_key: str = None):
-        self.distance_matrix = distance_matrix
         self.waypoints = waypoints
         self.n = len(waypoints)
+        self.distance_matrix = distance_matrix
         self.best_path = None
         self.best_distance = float('inf')
         self.optimization_history = []
         self.fixed_start = False  # If True, keep first waypoint fixed
         self.fixed_end = False    # If True, keep last waypoint fixed
+        self._rng = np.random.default_rng()  # WOA randomness, independent of the global RNG
         
         # Initialize route optimizer with API key if provided
         self.route_optimizer = None
@@ -42,9 +180,42 @@ class HybridQuantumWhaleOptimizer:
             try:
                 self.route_optimizer = RealWorldRouteOptimizer(api_key=api_key)
             except Exception as e:
-                print(f"Failed to initialize route optimizer: {e}")
+                logger.warning("Failed to initialize route optimizer: %s", e)
                 self.route_optimizer = None
         self.route_data = {}
+        
+        # Real-routing lookups per leg (from_idx, to_idx) and per-path geometry;
+        # the matrix-derived path caches are (re)set by the distance_matrix setter
+        self._segment_cache: Dict[Tuple[int, int], Tuple[float, Dict]] = {}
+        self._geometry_cache: Dict[Tuple[int, ...], List[List[float]]] = {}
+    
+    @property
+    def distance_matrix(self) -> np.ndarray:
+        return self._dm
+    
+    @distance_matrix.setter
+    def distance_matrix(self, distance_matrix: np.ndarray) -> None:
+        """
+        Store one C-contiguous float64 matrix shared by every phase (no copy when
+        the caller already passes one; float64 keeps reported route totals exact)
+        and drop everything derived from the previous matrix
+        """
+        self._dm = np.ascontiguousarray(distance_matrix, dtype=np.float64)
+        self._dist_cache: Dict[Tuple[int, ...], float] = {}
+        self._details_cache: Dict[Tuple[int, ...], Dict] = {}
+        
+        # Each city's TWO_OPT_NEIGHBORS closest cities, nearest first (2-opt candidates):
+        # by the edge out of the city, and by the edge into it (the same lists unless
+        # the matrix is asymmetric)
+        self._neighbors = None
+        self._in_neighbors = None
+        if len(self._dm) > TWO_OPT_NEIGHBORS + 1:
+            off_diagonal = self._dm.copy()
+            np.fill_diagonal(off_diagonal, np.inf)
+            self._neighbors = np.argsort(off_diagonal, axis=1, kind='stable')[:, :TWO_OPT_NEIGHBORS].tolist()
+            self._in_neighbors = self._neighbors
+            if not np.array_equal(off_diagonal, off_diagonal.T):
+                self._in_neighbors = np.argsort(off_diagonal.T, axis=1, kind='stable')[:, :TWO_OPT_NEIGHBORS].tolist()
     
     def optimize(self) -> Dict:
         """
@@ -61,8 +232,12 @@ class HybridQuantumWhaleOptimizer:
             'algorithm_summary': 'Quantum Annealing (Exploration) + Whale Optimization (Exploitation)'
         }
         
+        # One or two waypoints have a single ordering: skip the search phases
+        if self.n <= 2:
+            return self._trivial_result(result, start_time)
+        
         # Phase 1: Quantum Annealing for Exploration
-        print("Phase 1: Quantum Annealing (Exploration)...")
+        logger.debug("Phase 1: Quantum Annealing (Exploration)...")
         qa_path, qa_distance = self._quantum_annealing_phase()
         
         result['optimization_phases'].append({
@@ -74,8 +249,8 @@ class HybridQuantumWhaleOptimizer:
         })
         
         # Phase 2: Whale Optimization for Exploitation
-        print("Phase 2: Whale Optimization (Exploitation)...")
-        woa_path, woa_distance = self._whale_optimization_phase(initial_path=qa_path)
+        logger.debug("Phase 2: Whale Optimization (Exploitation)...")
+        woa_path, woa_distance = self._whale_optimization_phase(qa_path, qa_distance)
         
         result['optimization_phases'].append({
             'name': 'Whale Optimization',
@@ -86,8 +261,8 @@ class HybridQuantumWhaleOptimizer:
         })
         
         # Phase 3: Local Search Optimization
-        print("Phase 3: Local Search Optimization...")
-        final_path, final_distance = self._local_search_phase(woa_path)
+        logger.debug("Phase 3: Local Search Optimization...")
+        final_path, final_distance = self._local_search_phase(woa_path, woa_distance)
         
         result['optimization_phases'].append({
             'name': 'Local Search',
@@ -105,6 +280,10 @@ class HybridQuantumWhaleOptimizer:
         ]
         self.best_path, self.best_distance = min(all_results, key=lambda x: x[1])
         
+        # Fetch every leg of the candidate routes in one concurrent batch so the
+        # detail/geometry lookups below are served from the route cache
+        self._prefetch_legs([qa_path, woa_path, final_path])
+        
         # Get route details with real distances and geometry
         self.route_data = self._get_route_details(self.best_path)
         
@@ -113,7 +292,7 @@ class HybridQuantumWhaleOptimizer:
         result['route_details'] = self.route_data
         
         # Add final route geometry for drawing on map
-        result['route_geometry'] = self._get_final_route_geometry(self.best_path)
+        result['route_geometry'] = self._assemble_geometry(self.route_data)
         
         # Add comprehensive data for frontend
         result['optimized_order'] = self.best_path
@@ -140,7 +319,7 @@ class HybridQuantumWhaleOptimizer:
                 'path': qa_path,
                 'distance': float(qa_distance),
                 'duration': float(qa_route_details['total_duration_minutes']),
-                'geometry': self._get_final_route_geometry(qa_path),
+                'geometry': self._assemble_geometry(qa_route_details),
                 'segments': qa_route_details['segments'],
                 'color': '#f59e0b'  # Orange
             }
@@ -154,7 +333,7 @@ class HybridQuantumWhaleOptimizer:
                 'path': woa_path,
                 'distance': float(woa_distance),
                 'duration': float(woa_route_details['total_duration_minutes']),
-                'geometry': self._get_final_route_geometry(woa_path),
+                'geometry': self._assemble_geometry(woa_route_details),
                 'segments': woa_route_details['segments'],
                 'color': '#10b981'  # Green
             }
@@ -168,40 +347,27 @@ class HybridQuantumWhaleOptimizer:
                 'path': final_path,
                 'distance': float(final_distance),
                 'duration': float(final_route_details['total_duration_minutes']),
-                'geometry': self._get_final_route_geometry(final_path),
+                'geometry': self._assemble_geometry(final_route_details),
                 'segments': final_route_details['segments'],
                 'color': '#8b5cf6'  # Purple
             }
         
-        # For small problems, use exhaustive search to get ALL routes
-        if self.n <= 5:
-            print(f"Using exhaustive search for small problem ({self.n} waypoints)...")
+        # For small problems, solve exactly and return the best routes
+        if self.n <= EXACT_SEARCH_MAX_WAYPOINTS:
+            logger.debug("Using exhaustive search for small problem (%d waypoints)...", self.n)
             try:
                 all_routes = self._generate_alternative_routes()
-                print(f"Exhaustive search found {len(all_routes)} routes")
+                logger.debug("Exhaustive search found %d routes", len(all_routes))
                 
                 # Keep routes as list to preserve distance-sorted order
-                # Deduplicate by creating a dictionary then converting back to sorted list
-                if self.n == 2:
-                    # For 2-waypoint: different routes can have same path, dedupe by rounded distance
-                    seen_distances = set()
-                    unique_routes_list = []
-                    for route in all_routes:
-                        rounded_dist = round(route['distance'], 1)
-                        if rounded_dist not in seen_distances:
-                            seen_distances.add(rounded_dist)
-                            unique_routes_list.append(route)
-                    all_routes = unique_routes_list
-                else:
-                    # For 3+ waypoints: dedupe by path
-                    unique_routes_dict = {}
-                    for route in all_routes:
-                        path_key = tuple(route['path'])
-                        if path_key not in unique_routes_dict:
-                            unique_routes_dict[path_key] = route
-                    all_routes = list(unique_routes_dict.values())
-                    # Re-sort after deduplication
-                    all_routes.sort(key=lambda x: x['distance'])
+                # Deduplicate by path (n <= 2 returned early above), then re-sort
+                unique_routes_dict = {}
+                for route in all_routes:
+                    path_key = tuple(route['path'])
+                    if path_key not in unique_routes_dict:
+                        unique_routes_dict[path_key] = route
+                all_routes = list(unique_routes_dict.values())
+                all_routes.sort(key=lambda x: x['distance'])
                 
                 # Update the best path from exhaustive search
                 if all_routes:
@@ -215,40 +381,95 @@ class HybridQuantumWhaleOptimizer:
                     result['total_distance'] = best_route['distance']
                     result['total_duration'] = best_route['duration']
                     result['alternative_routes'] = all_routes  # Store as sorted list
-                    print(f"Best route from exhaustive search: {self.best_path} with distance {self.best_distance:.2f} km")
-                    print(f"Stored {len(all_routes)} routes in distance order")
+                    logger.debug("Best route from exhaustive search: %s with distance %.2f km", self.best_path, self.best_distance)
+                    logger.debug("Stored %d routes in distance order", len(all_routes))
                     return result
             except Exception as e:
-                print(f"Error in exhaustive search: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Error in exhaustive search")
         else:
             # Generate additional alternative routes if we have less than 3 unique routes
             if len(unique_routes) < 3:
-                print(f"Generating additional alternative routes... (currently have {len(unique_routes)})")
+                logger.debug("Generating additional alternative routes... (currently have %d)", len(unique_routes))
                 try:
                     alternative_strategies = self._generate_alternative_routes()
-                    print(f"Generated {len(alternative_strategies)} additional strategies")
+                    logger.debug("Generated %d additional strategies", len(alternative_strategies))
                     
                     for i, alt_route in enumerate(alternative_strategies):
                         alt_key = tuple(alt_route['path'])
                         if alt_key not in unique_routes and len(unique_routes) < 7:
                             unique_routes[alt_key] = alt_route
-                            print(f"Added {alt_route['name']} to alternatives")
+                            logger.debug("Added %s to alternatives", alt_route['name'])
                         else:
-                            print(f"Skipped {alt_route['name']} (duplicate path or limit reached)")
+                            logger.debug("Skipped %s (duplicate path or limit reached)", alt_route['name'])
                 except Exception as e:
-                    print(f"Error generating alternative routes: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("Error generating alternative routes")
         
         # Sort routes by distance and add to result
         sorted_routes = sorted(unique_routes.values(), key=lambda x: x['distance'])
         result['alternative_routes'] = sorted_routes
-        print(f"Returning {len(sorted_routes)} alternative routes to frontend")
+        logger.debug("Returning %d alternative routes to frontend", len(sorted_routes))
         
         return result
     
+    def _trivial_result(self, result: Dict, start_time: float) -> Dict:
+        """
+        Result for n <= 2, where [0, 1] is the only ordering: the route itself
+        plus, for two waypoints with real routing, alternative roads between them
+        """
+        self.best_path = list(range(self.n))
+        self.route_data = self._get_route_details(self.best_path)
+        self.best_distance = self.route_data['total_distance_km']
+        
+        alternatives = []
+        if self.n == 2 and self.route_optimizer:
+            try:
+                alternatives = self._generate_alternative_routes()
+            except Exception as e:
+                logger.warning("Could not get alternative routes: %s", e)
+        
+        if alternatives:
+            # Different roads can share a path: keep one route per rounded distance
+            seen_distances = set()
+            unique_alternatives = []
+            for route in alternatives:
+                rounded_dist = round(route['distance'], 1)
+                if rounded_dist not in seen_distances:
+                    seen_distances.add(rounded_dist)
+                    unique_alternatives.append(route)
+            alternatives = unique_alternatives
+            
+            best_route = alternatives[0]
+            self.best_distance = best_route['distance']
+            self.route_data = {'segments': best_route['segments'], 'total_distance_km': best_route['distance'],
+                               'total_duration_minutes': best_route['duration']}
+            route_geometry = best_route['geometry']
+        else:
+            route_geometry = self._assemble_geometry(self.route_data)
+            alternatives = [{
+                'name': 'Fastest Route',
+                'path': self.best_path,
+                'distance': float(self.best_distance),
+                'duration': float(self.route_data['total_duration_minutes']),
+                'geometry': route_geometry,
+                'segments': self.route_data['segments'],
+                'color': '#3b82f6'  # Blue
+            }]
+        
+        result['best_path'] = self.best_path
+        result['best_distance'] = float(self.best_distance)
+        result['route_details'] = self.route_data
+        result['route_geometry'] = route_geometry
+        result['optimized_order'] = self.best_path
+        result['total_distance'] = float(self.best_distance)
+        result['total_duration'] = float(self.route_data['total_duration_minutes'])
+        result['segments'] = self.route_data['segments']
+        result['optimization_method'] = 'hybrid'
+        result['optimization_time'] = time.time() - start_time
+        result['quantum_iterations'] = 0
+        result['woa_iterations'] = 0
+        result['alternative_routes'] = alternatives
+        return result
+    
     def _quantum_annealing_phase(self) -> Tuple[List[int], float]:
         """
         Phase 1: Quantum Annealing for exploration
@@ -264,45 +485,24 @@ class HybridQuantumWhaleOptimizer:
             return best_path, best_distance
         
         try:
-            for iteration in range(20):  # Reduced iterations for speed
-                # Create parameterized circuit
-                angle = (2 * math.pi) * (iteration / 20)
-                
-                # Simulate quantum circuit
-                qr = QuantumRegister(min(self.n, 8), 'q')
-                cr = ClassicalRegister(min(self.n, 8), 'c')
-                qc = QuantumCircuit(qr, cr)
-                
-                # Hadamard superposition
-                for i in range(min(self.n, 8)):
-                    qc.h(qr[i])
-                
-                # Problem-dependent ansatz
-                for i in range(min(self.n, 8)):
-                    qc.rx(angle, qr[i])
-                
-                # Entanglement
-                for i in range(min(self.n - 1, 7)):
-                    qc.cx(qr[i], qr[i + 1])
-                
-                # Phase rotation
-                for i in range(min(self.n, 8)):
-                    qc.rz(angle * 0.5, qr[i])
-                
-                # Measurement
-                for i in range(min(self.n, 8)):
-                    qc.measure(qr[i], cr[i])
-                
-                # Execute
-                simulator = AerSimulator()
-                transpiled = transpile(qc, simulator)
-                job = simulator.run(transpiled, shots=512)
-                result = job.result()
-                counts = result.get_counts()
+            simulator = _qa_simulator()
+            nq = min(self.n, 8)  # qubits simulated (capped for speed)
+            theta, ansatz = _qa_ansatz(nq)
+            
+            # One circuit per iteration's angle, all executed in a single submission
+            num_iterations = 20  # Reduced iterations for speed
+            circuits = [
+                ansatz.assign_parameters({theta: (2 * math.pi) * (iteration / num_iterations)}, inplace=False)
+                for iteration in range(num_iterations)
+            ]
+            result = simulator.run(circuits, shots=512).result()
+            
+            for iteration in range(num_iterations):
+                counts = result.get_counts(iteration)
                 
                 # Convert measurement to path
                 if counts:
-                    best_bitstring = max(counts, key=counts.get)
+                    best_bitstring = max(counts.items(), key=itemgetter(1))[0]
                     path = self._bitstring_to_path(best_bitstring)
                     distance = self._calculate_path_distance(path)
                     
@@ -317,23 +517,24 @@ class HybridQuantumWhaleOptimizer:
                 })
         
         except Exception as e:
-            print(f"Quantum error: {e}, using nearest neighbor fallback")
+            logger.warning("Quantum error: %s, using nearest neighbor fallback", e)
             best_path = TSPSolver.nearest_neighbor(self.distance_matrix)
             best_distance = self._calculate_path_distance(best_path)
         
         return best_path, best_distance
     
-    def _whale_optimization_phase(self, initial_path: List[int]) -> Tuple[List[int], float]:
+    def _whale_optimization_phase(self, initial_path: List[int], initial_distance: float) -> Tuple[List[int], float]:
         """
         Phase 2: Whale Optimization Algorithm
         Exploits the quantum solution using nature-inspired algorithm
+        All agents are moved and evaluated together as rows of one array
         """
-        best_path = initial_path.copy()
-        best_distance = self._calculate_path_distance(best_path)
+        best_path = list(initial_path)
+        best_distance = initial_distance
         
-        # Initialize agents (whale positions)
+        # Initialize agents (whale positions), one path per row
         num_agents = max(5, min(self.n, 10))
-        agents = [best_path.copy() for _ in range(num_agents)]
+        agents = np.tile(np.asarray(best_path, dtype=np.int32), (num_agents, 1))
         
         a_max = 2
         l_min = -1
@@ -342,31 +543,25 @@ class HybridQuantumWhaleOptimizer:
         for iteration in range(30):  # WOA iterations
             a = a_max - iteration * (a_max / 30)
             
-            for i in range(num_agents):
-                r = np.random.random()
-                A = 2 * a * r - a
-                C = 2 * r
-                l = np.random.uniform(l_min, l_max)
-                p = np.random.random()
-                
-                if p < 0.5:
-                    if abs(A) < 1:
-                        # Update towards best
-                        agents[i] = self._update_path(agents[i], best_path, A, C)
-                    else:
-                        # Update towards random agent
-                        rand_idx = np.random.randint(0, num_agents)
-                        agents[i] = self._update_path(agents[i], agents[rand_idx], A, C)
-                else:
-                    # Spiral update
-                    agents[i] = self._spiral_update_path(agents[i], best_path, l)
-                
-                # Evaluate
-                distance = self._calculate_path_distance(agents[i])
-                
-                if distance < best_distance:
-                    best_distance = distance
-                    best_path = agents[i].copy()
+            r = self._rng.random(num_agents)
+            A = 2 * a * r - a
+            l = self._rng.uniform(l_min, l_max, num_agents)
+            p = self._rng.random(num_agents)
+            
+            # Encircling / searching (p < 0.5) scale moves with |A|; the spiral
+            # update scales with |l| and always makes at least two swaps
+            num_swaps = np.where(p < 0.5,
+                                 np.maximum(1, (np.abs(A) * self.n).astype(int)),
+                                 np.maximum(2, (np.abs(l) * self.n).astype(int)))
+            self._swap_positions(agents, num_swaps)
+            
+            # Evaluate every agent in one gather
+            distances = self._dm[agents[:, :-1], agents[:, 1:]].sum(axis=1)
+            best_agent = int(np.argmin(distances))
+            
+            if distances[best_agent] < best_distance:
+                best_distance = float(distances[best_agent])
+                best_path = agents[best_agent].tolist()
             
             self.optimization_history.append({
                 'phase': 'WOA',
@@ -376,12 +571,15 @@ class HybridQuantumWhaleOptimizer:
         
         return best_path, best_distance
     
-    def _local_search_phase(self, initial_path: List[int]) -> Tuple[List[int], float]:
+    def _local_search_phase(self, initial_path: List[int], initial_distance: float) -> Tuple[List[int], float]:
         """
         Phase 3: 2-opt local search for final refinement
+        Each candidate swap is scored from the legs it changes instead of
+        re-summing the whole path
         """
-        path = initial_path.copy()
-        best_distance = self._calculate_path_distance(path)
+        d = self._dm.tolist()
+        path = list(initial_path)
+        best_distance = initial_distance
         improved = True
         iteration = 0
         
@@ -389,20 +587,21 @@ class HybridQuantumWhaleOptimizer:
             improved = False
             iteration += 1
             
-            for i in range(1, self.n - 1):
-                for j in range(i + 1, self.n):
-                    # 2-opt swap
-                    new_path = path[:i] + path[i:j][::-1] + path[j:]
-                    new_distance = self._calculate_path_distance(new_path)
-                    
-                    if new_distance < best_distance:
-                        path = new_path
-                        best_distance = new_distance
-                        improved = True
-                        break
-                
-                if improved:
-                    break
+            # Leg-cost prefix sums walking the path forwards and backwards: a reversed
+            # segment's internal cost is O(1) even when the matrix is asymmetric
+            forward = [0.0]
+            backward = [0.0]
+            for k in range(self.n - 1):
+                forward.append(forward[-1] + d[path[k]][path[k + 1]])
+                backward.append(backward[-1] + d[path[k + 1]][path[k]])
+            
+            move = self._find_two_opt_move(path, d, forward, backward)
+            if move is not None:
+                # Reverse in place from a single reversed slice (i >= 1)
+                i, j, delta = move
+                path[i:j] = path[j - 1:i - 1:-1]
+                best_distance += delta
+                improved = True
             
             self.optimization_history.append({
                 'phase': 'LocalSearch',
@@ -410,55 +609,145 @@ class HybridQuantumWhaleOptimizer:
                 'best_distance': best_distance
             })
         
-        return path, best_distance
+        # Re-sum once so accumulated deltas don't drift from the true length
+        return path, self._calculate_path_distance(path)
+    
+    def _find_two_opt_move(self, path: List[int], d: List[List[float]],
+                           forward: List[float], backward: List[float]) -> Optional[Tuple[int, int, float]]:
+        """
+        First improving 2-opt move (i, j, delta) that reverses path[i:j], or None
+        Past TWO_OPT_NEIGHBORS + 1 cities only moves adding an edge to a near
+        neighbor that is shorter than the edge it replaces are tried
+        """
+        n = self.n
+        
+        def gain(i, j):
+            prev_city, first_city = path[i - 1], path[i]
+            last_city, next_city = path[j - 1], path[j]
+            return (d[prev_city][last_city] + d[first_city][next_city]
+                    - d[prev_city][first_city] - d[last_city][next_city]
+                    + (backward[j - 1] - backward[i]) - (forward[j - 1] - forward[i]))
+        
+        if self._neighbors is None:
+            for i in range(1, n - 1):
+                for j in range(i + 1, n):
+                    delta = gain(i, j)
+                    if delta < -1e-9:
+                        return i, j, delta
+            return None
+        
+        position = [0] * n
+        for k, city in enumerate(path):
+            position[city] = k
+        
+        for k in range(n - 1):
+            city, succ = path[k], path[k + 1]
+            
+            # New edge city -> path[j - 1], replacing city -> succ (i = k + 1)
+            row, limit = d[city], d[city][succ]
+            for other in self._neighbors[city]:
+                if row[other] >= limit:
+                    break
+                j = position[other] + 1
+                if k + 1 < j - 1 and j < n:
+                    delta = gain(k + 1, j)
+                    if delta < -1e-9:
+                        return k + 1, j, delta
+            
+            # New edge path[i] -> path[j], in place of path[j - 1] -> path[j] (j = k + 1):
+            # candidates are the cities with the shortest edges into succ
+            limit = d[city][succ]
+            for other in self._in_neighbors[succ]:
+                if d[other][succ] >= limit:
+                    break
+                i = position[other]
+                if 1 <= i < k:
+                    delta = gain(i, k + 1)
+                    if delta < -1e-9:
+                        return i, k + 1, delta
+        
+        return None
     
-    def _update_path(self, current: List[int], target: List[int], A: float, C: float) -> List[int]:
-        """Update path position in whale optimization"""
-        new_path = current.copy()
+    def _iterated_local_search(self, initial_path: List[int], rng: np.random.Generator) -> Tuple[List[int], float]:
+        """
+        2-opt, then RESTART_KICKS rounds of double-bridge kick + 2-opt, keeping a
+        kicked tour only when it is shorter. The kick reorders three segments,
+        a move 2-opt alone cannot undo, so each round can leave the current local optimum
+        """
+        best_path, best_distance = self._local_search_phase(initial_path, self._calculate_path_distance(initial_path))
+        if self.n < 5:
+            return best_path, best_distance
         
-        # Perform some swaps based on parameters
-        num_swaps = max(1, int(abs(A) * self.n))
-        for _ in range(num_swaps):
-            i, j = np.random.choice(self.n, 2, replace=False)
-            new_path[i], new_path[j] = new_path[j], new_path[i]
+        for _ in range(RESTART_KICKS):
+            # Cut points strictly inside the path so both endpoints stay put
+            i, j, k = np.sort(rng.choice(np.arange(1, self.n), 3, replace=False)).tolist()
+            kicked = best_path[:i] + best_path[j:k] + best_path[i:j] + best_path[k:]
+            kicked, distance = self._local_search_phase(kicked, self._calculate_path_distance(kicked))
+            if distance < best_distance - 1e-9:
+                best_path, best_distance = kicked, distance
         
-        return new_path
+        return best_path, best_distance
     
-    def _spiral_update_path(self, current: List[int], best: List[int], l: float) -> List[int]:
-        """Spiral movement in whale optimization"""
-        new_path = current.copy()
+    def _swap_positions(self, agents: np.ndarray, num_swaps: np.ndarray) -> None:
+        """Apply num_swaps[k] random position swaps to agent row k, in place"""
+        num_agents = len(agents)
+        max_swaps = int(num_swaps.max())
         
-        # Perform spiral-like moves (more swaps)
-        num_swaps = max(2, int(abs(l) * self.n))
-        for _ in range(num_swaps):
-            i, j = np.random.choice(self.n, 2, replace=False)
-            new_path[i], new_path[j] = new_path[j], new_path[i]
+        # Distinct position pairs: second index is a non-zero offset from the first
+        first = self._rng.integers(0, self.n, (max_swaps, num_agents))
+        second = (first + self._rng.integers(1, self.n, (max_swaps, num_agents))) % self.n
+        rows = np.arange(num_agents)
         
-        return new_path
+        for step in range(max_swaps):
+            active = rows[num_swaps > step]
+            i, j = first[step, active], second[step, active]
+            agents[active, i], agents[active, j] = agents[active, j], agents[active, i]
     
     def _bitstring_to_path(self, bitstring: str) -> List[int]:
         """Convert quantum bitstring to valid path"""
         # Use bitstring as seed for path generation
         seed = int(bitstring, 2) if bitstring else 0
-        np.random.seed(seed % (2**31))
-        path = list(range(self.n))
-        np.random.shuffle(path)
-        return path
+        return np.random.default_rng(seed & 0x7FFFFFFF).permutation(self.n).tolist()
     
     def _calculate_path_distance(self, path: List[int]) -> float:
-        """Calculate total distance for a path"""
+        """Calculate total distance for a path (memoized by path)"""
         if len(path) != self.n:
             return float('inf')
         
-        total = 0
-        for i in range(self.n - 1):
-            total += self.distance_matrix[path[i]][path[i + 1]]
-        # No return to origin for this model
-        # total += self.distance_matrix[path[self.n - 1]][path[0]] 
-        return total
+        key = tuple(path)
+        distance = self._dist_cache.get(key)
+        if distance is None:
+            # No return to origin for this model
+            arr = np.asarray(path, dtype=np.intp)
+            distance = float(self._dm[arr[:-1], arr[1:]].sum())
+            
+            if len(self._dist_cache) >= PATH_DISTANCE_CACHE_SIZE:
+                del self._dist_cache[next(iter(self._dist_cache))]
+            self._dist_cache[key] = distance
+        return distance
+    
+    def _get_segment(self, from_idx: int, to_idx: int) -> Tuple[float, Dict]:
+        """Real route for one leg, fetched once per optimizer (failures are not cached)"""
+        key = (from_idx, to_idx)
+        segment = self._segment_cache.get(key)
+        if segment is None:
+            segment = self.route_optimizer.get_real_distance(self.waypoints[from_idx], self.waypoints[to_idx])
+            self._segment_cache[key] = segment
+        return segment
     
     def _get_route_details(self, path: List[int]) -> Dict:
-        """Get detailed route information with real routing data"""
+        """Get detailed route information with real routing data (memoized per path)"""
+        key = tuple(path)
+        details = self._details_cache.get(key)
+        if details is None:
+            details = self._details_cache[key] = self._build_route_details(path)
+        return details
+    
+    def _build_route_details(self, path: List[int]) -> Dict:
+        """
+        Segments and totals for a path (uncached; use _get_route_details)
+        Distances come from the real-routing matrix; only leg geometry is looked up
+        """
         details = {
             'path': path,
             'waypoints_in_order': [self.waypoints[i] for i in path],
@@ -467,6 +756,9 @@ class HybridQuantumWhaleOptimizer:
             'total_duration_minutes': 0
         }
         
+        # Legs of a path not seen before are fetched together, not one by one
+        self._prefetch_legs([path])
+        
         for i in range(len(path) - 1):
             from_idx = path[i]
             to_idx = path[i + 1]
@@ -474,15 +766,16 @@ class HybridQuantumWhaleOptimizer:
             from_waypoint = self.waypoints[from_idx]
             to_waypoint = self.waypoints[to_idx]
             
-            # Get real route info if available
-            try:
-                distance, route_info = self.route_optimizer.get_real_distance(from_waypoint, to_waypoint)
-                duration = route_info.get('duration', distance / 60 * 60)
-                geometry = route_info.get('geometry', [])
-            except:
-                distance = self.distance_matrix[from_idx][to_idx]
-                duration = distance / 60 * 60  # Assume 60 km/h
-                geometry = []
+            distance = self._dm[from_idx, to_idx]
+            
+            # Leg geometry from real routing if available
+            geometry = []
+            if self.route_optimizer:
+                try:
+                    _, route_info = self._get_segment(from_idx, to_idx)
+                    geometry = route_info.get('geometry', [])
+                except Exception as e:
+                    logger.warning("Could not retrieve geometry for segment %d->%d: %s", from_idx, to_idx, e)
             
             segment = {
                 'from': {
@@ -506,30 +799,48 @@ class HybridQuantumWhaleOptimizer:
         
         return details
 
-    def _get_final_route_geometry(self, path: List[int]) -> List[List[float]]:
+    def _prefetch_legs(self, paths: List[List[int]]) -> None:
         """
-        Get the final, combined route geometry for the best path.
-        Returns coordinates in [lat, lng] format for Leaflet
+        Fetch every not-yet-cached leg of the given paths concurrently into the
+        segment cache; legs that fail stay uncached and fall back per segment
         """
+        if not self.route_optimizer:
+            return
+        
+        legs = list({(path[i], path[i + 1]) for path in paths for i in range(len(path) - 1)}
+                    - self._segment_cache.keys())
+        if not legs:
+            return
+        
+        try:
+            results = self.route_optimizer.get_real_distances(
+                [(self.waypoints[a], self.waypoints[b]) for a, b in legs]
+            )
+            self._segment_cache.update(zip(legs, results))
+        except Exception as e:
+            logger.warning("Could not prefetch route legs: %s", e)
+    
+    def _assemble_geometry(self, details: Dict) -> List[List[float]]:
+        """
+        Combined route geometry for a path from its route details' segments.
+        Returns coordinates in [lat, lng] format for Leaflet (memoized per path)
+        """
+        key = tuple(details['path'])
+        if key in self._geometry_cache:
+            return self._geometry_cache[key]
+        
         full_geometry = []
-        for i in range(len(path) - 1):
-            from_waypoint = self.waypoints[path[i]]
-            to_waypoint = self.waypoints[path[i+1]]
-            
-            # Get the geometry for this specific leg
-            try:
-                _, route_info = self.route_optimizer.get_real_distance(from_waypoint, to_waypoint)
-                if route_info and route_info.get('geometry'):
-                    # The geometry is a list of [lon, lat] points from ORS
-                    # We need to swap them to [lat, lon] for Leaflet
-                    for point in route_info['geometry']:
-                        full_geometry.append([point[1], point[0]])  # Swap lon,lat to lat,lng
-            except Exception as e:
-                print(f"Could not retrieve geometry for segment {path[i]}->{path[i+1]}: {e}", file=sys.stderr)
-                # Fallback to a straight line between the points
-                full_geometry.append([from_waypoint['lat'], from_waypoint['lng']])
-                full_geometry.append([to_waypoint['lat'], to_waypoint['lng']])
-
+        for segment in details['segments']:
+            if segment['geometry']:
+                # The geometry is a list of [lon, lat] points from ORS
+                # We need to swap them to [lat, lon] for Leaflet
+                full_geometry.extend([point[1], point[0]] for point in segment['geometry'])
+            else:
+                # No road geometry for this leg: straight line between the points
+                full_geometry.append([segment['from']['coordinates']['lat'], segment['from']['coordinates']['lng']])
+                full_geometry.append([segment['to']['coordinates']['lat'], segment['to']['coordinates']['lng']])
+        
+        self._geometry_cache[key] = full_geometry
         return full_geometry
 
     def _generate_alternative_routes(self) -> List[Dict]:
@@ -538,14 +849,13 @@ class HybridQuantumWhaleOptimizer:
         to ensure we always have multiple options to show
         
         For 2-waypoint problems: Get alternative road routes from OpenRouteService
-        For 3-5 waypoint problems: Check all permutations
+        For 3-12 waypoint problems: Exact k-best search (Held-Karp)
         """
         alternatives = []
-        colors = ['#3b82f6', '#ef4444', '#f97316', '#14b8a6', '#a855f7', '#ec4899', '#f59e0b']  # Blue, Red, Orange, Teal, Purple, Pink, Amber
         
         # Special case: 2 waypoints - get alternative routes from API (coastal vs inland, etc.)
         if self.n == 2 and self.route_optimizer:
-            print(f"2-waypoint problem: requesting alternative routes from OpenRouteService (coastal/inland/etc)...")
+            logger.debug("2-waypoint problem: requesting alternative routes from OpenRouteService (coastal/inland/etc)...")
             try:
                 point1 = self.waypoints[0]
                 point2 = self.waypoints[1]
@@ -570,139 +880,158 @@ class HybridQuantumWhaleOptimizer:
                             'duration_minutes': float(route_info['duration']),
                             'geometry': geometry
                         }],
-                        'color': colors[i % len(colors)]
+                        'color': _COLORS[i % len(_COLORS)]
                     })
                 
-                # Sort by distance (shortest first)
-                print(f"Before sorting: {[(r['name'], r['distance']) for r in alternatives]}")
+                # Sort by distance (shortest first) and reassign names
+                debug = logger.isEnabledFor(logging.DEBUG)
+                if debug:
+                    logger.debug("Before sorting: %s", [(r['name'], r['distance']) for r in alternatives])
                 alternatives.sort(key=lambda x: x['distance'])
-                print(f"After sorting: {[(r['distance'], r['name']) for r in alternatives]}")
                 
-                # Reassign names after sorting
                 for i, route in enumerate(alternatives):
                     old_name = route['name']
                     route['name'] = f'Route Option {i+1}' if i > 0 else 'Fastest Route'
-                    print(f"Route {i}: {route['distance']:.2f} km - renamed from '{old_name}' to '{route['name']}'")
+                    if debug:
+                        logger.debug("Route %d: %.2f km - renamed from '%s' to '%s'", i, route['distance'], old_name, route['name'])
                 
-                print(f"Got {len(alternatives)} alternative routes from OpenRouteService (sorted by distance)")
-                print(f"Final route order: {[(r['name'], r['distance']) for r in alternatives]}")
+                logger.debug("Got %d alternative routes from OpenRouteService (sorted by distance)", len(alternatives))
+                if debug:
+                    logger.debug("Final route order: %s", [(r['name'], r['distance']) for r in alternatives])
                 return alternatives
                 
             except Exception as e:
-                print(f"Could not get alternative routes from ORS: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Could not get alternative routes from ORS")
         
-        # For small problems (3-5 cities), generate all permutations
-        if self.n >= 3 and self.n <= 5:
-            import itertools
-            
-            # If start and end are fixed, only permute intermediate waypoints
-            if self.fixed_start and self.fixed_end and self.n > 2:
-                intermediate_indices = list(range(1, self.n - 1))
-                num_perms = math.factorial(len(intermediate_indices)) if intermediate_indices else 1
-                print(f"Fixed start/end: checking {num_perms} permutations of {len(intermediate_indices)} intermediate waypoints...")
-                
-                if intermediate_indices:
-                    intermediate_perms = list(itertools.permutations(intermediate_indices))
-                    all_perms = [[0] + list(perm) + [self.n - 1] for perm in intermediate_perms]
-                else:
-                    all_perms = [[0, self.n - 1]]
-            else:
-                print(f"Small problem detected ({self.n} waypoints), checking all {math.factorial(self.n)} permutations...")
-                all_perms = [list(perm) for perm in itertools.permutations(range(self.n))]
-            
-            # Calculate real distance for each permutation
+        # For small problems (3-12 cities), solve exactly on the matrix (no network)
+        # and fetch route details only for the routes that will be shown
+        if self.n >= 3 and self.n <= EXACT_SEARCH_MAX_WAYPOINTS:
+            logger.debug("Small problem detected (%d waypoints), exact search for the 5 best routes...", self.n)
+            shown_perms = self._held_karp(self._dm, self.fixed_start, self.fixed_end, k=5)
+            self._prefetch_legs(shown_perms)
             perm_results = []
-            for path in all_perms:
-                # Get actual route details (with real routing)
+            for path in shown_perms:
                 try:
                     route_details = self._get_route_details(path)
                     distance = route_details['total_distance_km']
                     perm_results.append((path, distance, route_details))
                 except Exception as e:
-                    print(f"Error calculating route for {path}: {e}")
+                    logger.warning("Error calculating route for %s: %s", path, e)
                     continue
             
-            # Sort by distance
-            perm_results.sort(key=lambda x: x[1])
-            
-            # Take top 5 unique routes
-            added_count = 0
-            for i, (path, distance, route_details) in enumerate(perm_results):
-                if added_count >= 5:
-                    break
-                    
-                alternatives.append({
+            # Take top 5 unique routes, shortest first
+            return [
+                {
                     'name': f'Route Option {i+1}' if i > 0 else 'Optimal Route',
                     'path': path,
                     'distance': float(distance),
                     'duration': float(route_details['total_duration_minutes']),
-                    'geometry': self._get_final_route_geometry(path),
+                    'geometry': self._assemble_geometry(route_details),
                     'segments': route_details['segments'],
-                    'color': colors[i % len(colors)]
-                })
-                added_count += 1
-            
-            return alternatives
+                    'color': _COLORS[i % len(_COLORS)]
+                }
+                for i, (path, distance, route_details) in enumerate(sorted(perm_results[:5], key=lambda x: x[1]))
+            ]
+        
+        # For larger problems, use heuristics. The paths are cheap to build, so
+        # build them all first and fetch their road legs in one concurrent batch
+        candidates = []  # (name, path, color)
         
-        # For larger problems, use heuristics
         # Strategy 1: Nearest Neighbor (greedy approach)
         try:
-            nn_path = TSPSolver.nearest_neighbor(self.distance_matrix)
-            nn_route_details = self._get_route_details(nn_path)
-            alternatives.append({
-                'name': 'Nearest Neighbor Route',
-                'path': nn_path,
-                'distance': float(nn_route_details['total_distance_km']),
-                'duration': float(nn_route_details['total_duration_minutes']),
-                'geometry': self._get_final_route_geometry(nn_path),
-                'segments': nn_route_details['segments'],
-                'color': colors[0]
-            })
+            candidates.append(('Nearest Neighbor Route', TSPSolver.nearest_neighbor(self.distance_matrix), _COLORS[0]))
         except Exception as e:
-            print(f"Could not generate nearest neighbor route: {e}")
+            logger.warning("Could not generate nearest neighbor route: %s", e)
         
         # Strategy 2: Farthest Insertion (different construction heuristic)
         try:
-            fi_path = self._farthest_insertion()
-            fi_route_details = self._get_route_details(fi_path)
-            alternatives.append({
-                'name': 'Farthest Insertion Route',
-                'path': fi_path,
-                'distance': float(fi_route_details['total_distance_km']),
-                'duration': float(fi_route_details['total_duration_minutes']),
-                'geometry': self._get_final_route_geometry(fi_path),
-                'segments': fi_route_details['segments'],
-                'color': colors[1]
-            })
+            candidates.append(('Farthest Insertion Route', self._farthest_insertion(), _COLORS[1]))
         except Exception as e:
-            print(f"Could not generate farthest insertion route: {e}")
+            logger.warning("Could not generate farthest insertion route: %s", e)
         
-        # Strategy 3: Random restart with 2-opt (different local optimum)
+        # Strategy 3: Random restart with iterated 2-opt (different local optimum)
         try:
             for i in range(2):  # Generate 2 different random routes
+                rng = np.random.default_rng(42 + i)  # Different seed for each
                 random_path = list(range(self.n))
-                np.random.seed(42 + i)  # Different seed for each
-                np.random.shuffle(random_path)
-                random_path, _ = self._local_search_phase(random_path)
-                random_route_details = self._get_route_details(random_path)
+                rng.shuffle(random_path)
+                random_path, _ = self._iterated_local_search(random_path, rng)
+                candidates.append((f'Random Restart Route {i+1}', random_path, _COLORS[3 + i]))
+        except Exception as e:
+            logger.exception("Could not generate random restart route")
+        
+        self._prefetch_legs([path for _, path, _ in candidates])
+        for name, path, color in candidates:
+            try:
+                route_details = self._get_route_details(path)
                 alternatives.append({
-                    'name': f'Random Restart Route {i+1}',
-                    'path': random_path,
-                    'distance': float(random_route_details['total_distance_km']),
-                    'duration': float(random_route_details['total_duration_minutes']),
-                    'geometry': self._get_final_route_geometry(random_path),
-                    'segments': random_route_details['segments'],
-                    'color': colors[3 + i]
+                    'name': name,
+                    'path': path,
+                    'distance': float(route_details['total_distance_km']),
+                    'duration': float(route_details['total_duration_minutes']),
+                    'geometry': self._assemble_geometry(route_details),
+                    'segments': route_details['segments'],
+                    'color': color
                 })
-        except Exception as e:
-            print(f"Could not generate random restart route: {e}")
-            import traceback
-            traceback.print_exc()
+            except Exception as e:
+                logger.warning("Could not build %s: %s", name, e)
         
         return alternatives
     
+    @staticmethod
+    def _held_karp(dm: np.ndarray, fixed_start: bool, fixed_end: bool, k: int = 1) -> List[List[int]]:
+        """
+        Exact open-path TSP by bitmask dynamic programming, keeping the k best
+        partial paths per (visited set, last city) state
+        Returns up to k distinct paths visiting every city, shortest first
+        """
+        n = len(dm)
+        end = n - 1
+        full = (1 << n) - 1
+        
+        # cost[mask, j, r]: r-th best path over cities in mask ending at j
+        cost = np.full((1 << n, n, k), np.inf)
+        prev_city = np.zeros((1 << n, n, k), dtype=np.int64)
+        prev_rank = np.zeros((1 << n, n, k), dtype=np.int64)
+        for start in ([0] if fixed_start else range(n)):
+            cost[1 << start, start, 0] = 0.0
+        
+        masks = np.arange(1 << n)
+        popcount = np.array([bin(m).count('1') for m in range(1 << n)])
+        
+        for size in range(2, n + 1):
+            layer = masks[popcount == size]
+            for j in range(n):
+                # A fixed destination can only be entered as the final city
+                if fixed_end and j == end and size < n:
+                    continue
+                
+                sel = layer[(layer >> j) & 1 == 1]
+                # Extend every kept path over mask - {j} by the leg to j
+                cand = (cost[sel ^ (1 << j)] + dm[:, j][None, :, None]).reshape(len(sel), n * k)
+                order = np.argsort(cand, axis=1, kind='stable')[:, :k]
+                cost[sel, j] = np.take_along_axis(cand, order, axis=1)
+                prev_city[sel, j] = order // k
+                prev_rank[sel, j] = order % k
+        
+        # Best complete paths across the allowed final cities
+        finals = [end] if fixed_end else range(n)
+        ends = sorted((cost[full, j, r], j, r) for j in finals for r in range(k))
+        
+        paths = []
+        for total, j, r in ends[:k]:
+            if not np.isfinite(total):
+                break
+            mask, path = full, [j]
+            while mask != (1 << j):
+                i, r = int(prev_city[mask, j, r]), int(prev_rank[mask, j, r])
+                mask ^= 1 << j
+                j = i
+                path.append(j)
+            paths.append(path[::-1])
+        
+        return paths
+    
     def _farthest_insertion(self) -> List[int]:
         """
         Farthest Insertion heuristic for TSP
@@ -712,47 +1041,36 @@ class HybridQuantumWhaleOptimizer:
         if n <= 2:
             return list(range(n))
         
-        # Start with two farthest cities
-        max_dist = 0
-        start_i, start_j = 0, 1
-        for i in range(n):
-            for j in range(i + 1, n):
-                if self.distance_matrix[i][j] > max_dist:
-                    max_dist = self.distance_matrix[i][j]
-                    start_i, start_j = i, j
+        if NUMBA_AVAILABLE:
+            return _farthest_insertion_nb(self._dm).tolist()
+        
+        # Start with two farthest cities (first maximum over the upper triangle)
+        iu = np.triu_indices(n, k=1)
+        idx = int(np.argmax(self._dm[iu]))
+        start_i, start_j = int(iu[0][idx]), int(iu[1][idx])
         
-        tour = [start_i, start_j]
-        unvisited = set(range(n)) - {start_i, start_j}
+        dm = self._dm
+        tour = np.array([start_i, start_j], dtype=np.int64)
+        unvisited_mask = np.ones(n, dtype=bool)
+        unvisited_mask[[start_i, start_j]] = False
         
-        while unvisited:
+        # Each city's distance to its closest tour city, updated as cities are added
+        min_to_tour = np.minimum(dm[:, start_i], dm[:, start_j])
+        
+        for _ in range(n - 2):
             # Find farthest city from tour
-            farthest_city = None
-            max_min_dist = -1
-            
-            for city in unvisited:
-                min_dist = min(self.distance_matrix[city][tour_city] for tour_city in tour)
-                if min_dist > max_min_dist:
-                    max_min_dist = min_dist
-                    farthest_city = city
+            farthest_city = int(np.argmax(np.where(unvisited_mask, min_to_tour, -np.inf)))
             
-            # Find best insertion position
-            best_pos = 0
-            best_cost = float('inf')
+            # Find best insertion position: cost of each (tour[k], tour[k + 1]) edge, cyclically
+            tour_next = np.roll(tour, -1)
+            costs = dm[tour, farthest_city] + dm[farthest_city, tour_next] - dm[tour, tour_next]
+            best_pos = (int(np.argmin(costs)) + 1) % len(tour)
             
-            for pos in range(len(tour)):
-                next_pos = (pos + 1) % len(tour)
-                cost = (self.distance_matrix[tour[pos]][farthest_city] + 
-                       self.distance_matrix[farthest_city][tour[next_pos]] -
-                       self.distance_matrix[tour[pos]][tour[next_pos]])
-                
-                if cost < best_cost:
-                    best_cost = cost
-                    best_pos = next_pos
-            
-            tour.insert(best_pos, farthest_city)
-            unvisited.remove(farthest_city)
+            tour = np.insert(tour, best_pos, farthest_city)
+            unvisited_mask[farthest_city] = False
+            np.minimum(min_to_tour, dm[:, farthest_city], out=min_to_tour)
         
-        return tour
+        return tour.tolist()
 
 
 # Main execution
@@ -781,6 +1099,10 @@ if __name__ == "__main__":
         optimizer.route_optimizer = route_optimizer 
         result = optimizer.optimize()
         
-        print(json.dumps(result))
+        if ORJSON_AVAILABLE:
+            sys.stdout.flush()
+            sys.stdout.buffer.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n')
+        else:
+            print(json.dumps(result))
     else:
         print(json.dumps({"error": "Insufficient waypoints provided. Need at least 2."}))
@@ -1,11 +1,185 @@
 import requests
 import json
 import math
+import sqlite3
 import time
-from typing import List, Dict, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 import numpy as np
-import openrouteservice
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+ORS_DIRECTIONS_URL = 'https://api.openrouteservice.org/v2/directions/driving-car'
+ORS_MATRIX_URL = 'https://api.openrouteservice.org/v2/matrix/driving-car'
+
+# ORS matrix quota: sources x destinations per request (larger sets are split by rows)
+ORS_MATRIX_MAX_ELEMENTS = 3500
+
+# Haversine fallback: actual roads are ~1.2-1.5x longer than the straight line
+HAVERSINE_ROAD_FACTOR = 1.3
+
+# Max in-flight ORS requests per process (also sizes the connection pool)
+MAX_CONCURRENT_REQUESTS = 16
+
+# HTTP statuses worth retrying: rate limiting (honours Retry-After) and server errors
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+
+# Matrix API rejections for exceeding the element quota / request size limits;
+# the only HTTP errors for which pairwise directions calls can still succeed
+MATRIX_LIMIT_STATUSES = (400, 413)
+
+# Shared session so every ORS call reuses pooled keep-alive connections.
+# Connection errors, timeouts and transient statuses are retried with backoff;
+# all ORS endpoints used here are POST.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=MAX_CONCURRENT_REQUESTS,
+    pool_maxsize=MAX_CONCURRENT_REQUESTS,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=TRANSIENT_STATUSES,
+                      allowed_methods=frozenset(['GET', 'POST']), raise_on_status=False)
+))
+_REQUEST_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# Process-wide route memo size (entries are per api key + rounded leg)
+ROUTE_CACHE_SIZE = 8192
+
+# On-disk route store shared across processes and restarts ('' disables it)
+ROUTE_STORE_PATH = os.environ.get(
+    'ROUTE_STORE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'qaewo', 'routes.sqlite3')
+)
+
+
+class _RouteStore:
+    """
+    Successful ORS results keyed by the comma-joined route_cache key, as JSON rows in SQLite.
+    Writes go straight through, so concurrent workers and later runs share them.
+    """
+    
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS routes (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._conn.commit()
+    
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM routes WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, key: str, value) -> None:
+        data = json.dumps(value)
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO routes (key, value) VALUES (?, ?)', (key, data))
+            self._conn.commit()
+
+
+@lru_cache(maxsize=None)
+def _route_store(path: str):
+    """Process-wide store for path, or None when it can't be opened (e.g. read-only home)"""
+    try:
+        return _RouteStore(path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Route store unavailable ({e}); caching routes in memory only")
+        return None
+
+
+def _ors_post(session: requests.Session, api_key: str, url: str, payload: Dict, timeout: int) -> requests.Response:
+    """
+    POST a JSON payload to OpenRouteService.
+    Concurrent callers are throttled to MAX_CONCURRENT_REQUESTS in flight.
+    """
+    headers = {
+        'Content-Type': 'application/json; charset=utf-8',
+        'Accept': 'application/json, application/geo+json',
+        'Authorization': api_key
+    }
+    with _REQUEST_SLOTS:
+        return session.post(url, json=payload, headers=headers, timeout=timeout)
+
+
+def _response_json(response: requests.Response):
+    """Parsed ORS response body (orjson when installed: geometry-heavy payloads parse much faster)"""
+    return orjson.loads(response.content) if ORJSON_AVAILABLE else response.json()
+
+
+def _decode_polyline(encoded: str) -> List[List[float]]:
+    """
+    Decode an encoded polyline (precision 5) to [lng, lat] pairs in one NumPy
+    pass; same output as openrouteservice.convert.decode_polyline's coordinates
+    """
+    if not encoded:
+        return []
+    
+    # Each value is a run of 5-bit chunks (+63), little-endian; bit 0x20 marks "more follow"
+    chunks = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    is_last = (chunks & 0x20) == 0
+    starts = np.flatnonzero(np.concatenate(([True], is_last[:-1])))
+    value_index = np.concatenate(([0], np.cumsum(is_last)[:-1]))
+    shifts = 5 * (np.arange(len(chunks)) - starts[value_index])
+    values = np.add.reduceat((chunks & 0x1f) << shifts, starts)
+    
+    # Zigzag sign decoding, then (lat, lng) deltas accumulate into positions
+    values = (values >> 1) ^ -(values & 1)
+    coords = np.cumsum(values.reshape(-1, 2), axis=0) / 1e5
+    return coords[:, ::-1].tolist()
+
+
+def _location_key(point: Dict) -> Tuple[int, int]:
+    """Point rounded to 4 decimals (~11 m) as integers, for cheap hashing"""
+    return round(point['lat'] * 1e4), round(point['lng'] * 1e4)
+
+
+def _is_road_route(route_data: Dict) -> bool:
+    """True for routes that came from OpenRouteService (not the Haversine fallback)"""
+    return route_data.get('provider') == 'OpenRouteService'
+
+
+def _route_key(point1: Dict, point2: Dict) -> Tuple[int, ...]:
+    """route_cache key for the leg point1 -> point2"""
+    return _location_key(point1) + _location_key(point2)
+
+
+@lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def _cached_ors_route(session: requests.Session, api_key: str, timeout: int,
+                      lat1: float, lng1: float, lat2: float, lng2: float) -> Tuple[float, Dict]:
+    """
+    Single driving route from OpenRouteService, memoized for the life of the
+    process so legs repeated across requests never hit the network twice.
+    Callers round coordinates to 5 decimals (~1 m) so nearby clicks share entries.
+    Failures raise and are therefore never cached.
+    """
+    payload = {
+        'coordinates': [[lng1, lat1], [lng2, lat2]],
+        'radiuses': [10000, 10000]  # Increase radius for better matching
+    }
+    response = _ors_post(session, api_key, ORS_DIRECTIONS_URL, payload, timeout)
+    response.raise_for_status()
+    routes = _response_json(response)
+    
+    if not (routes and 'routes' in routes and len(routes['routes']) > 0):
+        raise Exception("No route found by OpenRouteService")
+    
+    route = routes['routes'][0]
+    summary = route['summary']
+    distance_km = summary['distance'] / 1000
+    
+    return distance_km, {
+        'distance': distance_km,
+        'duration': summary['duration'] / 60,  # in minutes
+        'geometry': _decode_polyline(route['geometry']), # Return decoded coordinates
+        'legs': route.get('segments', []),
+        'provider': 'OpenRouteService'
+    }
 
 
 class RealWorldRouteOptimizer:
@@ -14,67 +188,128 @@ class RealWorldRouteOptimizer:
     Uses OpenRouteService for routing.
     """
     
-    def __init__(self, api_key: str, timeout: int = 30):
+    def __init__(self, api_key: str, timeout: int = 30, session: requests.Session = None):
         """
         Initialize router
         Args:
             api_key: Your OpenRouteService API key.
             timeout: Request timeout in seconds.
+            session: HTTP session to use; defaults to the process-wide pooled session.
         """
         if not api_key:
             raise ValueError("OpenRouteService API key is required.")
         
         self.api_key = api_key  # Store API key for REST calls
-        self.client = openrouteservice.Client(key=api_key)
+        self.session = session or _SESSION
         self.timeout = timeout
         
         # Backup: Use Haversine if routing fails
         self.fallback_to_haversine = True
         
-        # Cache for route calculations
+        # Pairwise fallback: route each unordered pair once and mirror it (one-way
+        # streets make real roads slightly asymmetric; set False to route both ways)
+        self.assume_symmetric = True
+        
+        # Cache for route calculations (bounded: instances may live for the whole process),
+        # backed by the on-disk store for results that came from ORS
         self.route_cache = {}
+        self.route_store = _route_store(ROUTE_STORE_PATH) if ROUTE_STORE_PATH else None
     
     def get_real_distance(self, point1: Dict, point2: Dict) -> Tuple[float, Dict]:
         """
         Get real distance between two points using actual roads
         Returns: (distance_in_km, route_data)
         """
-        cache_key = f"{point1['lat']:.4f},{point1['lng']:.4f}_{point2['lat']:.4f},{point2['lng']:.4f}"
+        cache_key = _route_key(point1, point2)
         
         if cache_key in self.route_cache:
             return self.route_cache[cache_key]
         
+        stored = self._store_get(cache_key)
+        if stored is not None:
+            distance, route_data = stored
+            self._cache_put(cache_key, (distance, route_data))
+            return distance, route_data
+        
         try:
             distance, route_data = self._ors_distance(point1, point2)
             
-            # Cache result
-            self.route_cache[cache_key] = (distance, route_data)
+            # Cache result; only real road routes are kept (a swallowed ORS error comes
+            # back as the straight-line fallback, which is retried on the next call)
+            if _is_road_route(route_data):
+                self._cache_put(cache_key, (distance, route_data))
+                self._store_put(cache_key, (distance, route_data))
             return distance, route_data
             
         except Exception as e:
             print(f"Routing error: {e}")
             # Fallback to Haversine
             if self.fallback_to_haversine:
-                distance, route_data = self._haversine_distance(point1, point2)
-                self.route_cache[cache_key] = (distance, route_data)
-                return distance, route_data
+                return self._haversine_distance(point1, point2)
             raise
     
+    def _cache_put(self, cache_key: Tuple, value) -> None:
+        """Store a route cache entry, evicting the oldest once ROUTE_CACHE_SIZE is reached"""
+        if len(self.route_cache) >= ROUTE_CACHE_SIZE:
+            self.route_cache.pop(next(iter(self.route_cache)), None)
+        self.route_cache[cache_key] = value
+    
+    def _store_get(self, cache_key: Tuple):
+        """Route store entry for cache_key, or None (missing, disabled or unreadable)"""
+        if self.route_store is None:
+            return None
+        try:
+            return self.route_store.get(','.join(map(str, cache_key)))
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Route store read error: {e}")
+            return None
+    
+    def _store_put(self, cache_key: Tuple, value) -> None:
+        """Write an ORS result through to the route store; failures only cost the reuse"""
+        if self.route_store is None:
+            return
+        try:
+            self.route_store.put(','.join(map(str, cache_key)), value)
+        except sqlite3.Error as e:
+            print(f"Route store write error: {e}")
+    
+    def get_real_distances(self, pairs: List[Tuple[Dict, Dict]], max_workers: int = 8) -> List[Tuple[float, Dict]]:
+        """
+        Get real distances for many (point1, point2) pairs concurrently
+        Wall time is roughly the slowest request rather than the sum of all.
+        Returns: list of (distance_in_km, route_data) in the same order as pairs
+        """
+        if len(pairs) <= 1:
+            return [self.get_real_distance(point1, point2) for point1, point2 in pairs]
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pairs))) as executor:
+            return list(executor.map(lambda pair: self.get_real_distance(*pair), pairs))
+    
     def get_alternative_routes(self, point1: Dict, point2: Dict, max_alternatives: int = 3) -> List[Tuple[float, Dict]]:
         """
         Get multiple alternative routes between two points (e.g., coastal vs inland)
         Returns: List of (distance_in_km, route_data) tuples
         """
-        cache_key = f"{point1['lat']:.4f},{point1['lng']:.4f}_{point2['lat']:.4f},{point2['lng']:.4f}_alternatives"
+        cache_key = _route_key(point1, point2) + ('alternatives',)
         
         if cache_key in self.route_cache:
             return self.route_cache[cache_key]
         
+        stored = self._store_get(cache_key)
+        if stored is not None:
+            alternatives = [(distance, route_data) for distance, route_data in stored]
+            self._cache_put(cache_key, alternatives)
+            return alternatives
+        
         try:
             alternatives = self._ors_alternative_routes(point1, point2, max_alternatives)
             
-            # Cache result
-            self.route_cache[cache_key] = alternatives
+            # Cache result unless it degraded to the straight-line fallback
+            if all(_is_road_route(route_data) for _, route_data in alternatives):
+                self._cache_put(cache_key, alternatives)
+                if len(alternatives) > 1:
+                    # A single route may be the degraded fallback; don't keep it past this process
+                    self._store_put(cache_key, alternatives)
             return alternatives
             
         except Exception as e:
@@ -83,6 +318,10 @@ class RealWorldRouteOptimizer:
             distance, route_data = self.get_real_distance(point1, point2)
             return [(distance, route_data)]
     
+    def _ors_post(self, url: str, payload: Dict) -> requests.Response:
+        """POST a JSON payload to OpenRouteService through this router's session"""
+        return _ors_post(self.session, self.api_key, url, payload, self.timeout)
+    
     def _ors_alternative_routes(self, point1: Dict, point2: Dict, max_alternatives: int = 3) -> List[Tuple[float, Dict]]:
         """
         Get multiple alternative routes using OpenRouteService REST API
@@ -96,14 +335,6 @@ class RealWorldRouteOptimizer:
         # First try the standard alternative routes API
         try:
             # Use direct REST API call for alternative routes
-            url = 'https://api.openrouteservice.org/v2/directions/driving-car'
-            
-            headers = {
-                'Content-Type': 'application/json; charset=utf-8',
-                'Accept': 'application/json, application/geo+json',
-                'Authorization': self.api_key  # Use the stored API key
-            }
-            
             payload = {
                 'coordinates': [
                     [point1['lng'], point1['lat']],
@@ -118,10 +349,10 @@ class RealWorldRouteOptimizer:
             
             print(f"Attempting ORS alternative routes API...")
             
-            response = requests.post(url, json=payload, headers=headers, timeout=self.timeout)
+            response = self._ors_post(ORS_DIRECTIONS_URL, payload)
             
             if response.status_code != 200:
-                error_data = response.json()
+                error_data = _response_json(response)
                 if 'error' in error_data and 'code' in error_data['error'] and error_data['error']['code'] == 2004:
                     # Route too long for alternative routes API (>100km)
                     print(f"Route exceeds 100km limit, generating alternatives via intermediate waypoints...")
@@ -131,7 +362,7 @@ class RealWorldRouteOptimizer:
             
             response.raise_for_status()
             
-            data = response.json()
+            data = _response_json(response)
             
             if 'routes' in data:
                 print(f"Got {len(data['routes'])} alternative routes from OpenRouteService")
@@ -142,8 +373,7 @@ class RealWorldRouteOptimizer:
                     # Decode polyline geometry
                     geometry = route['geometry']
                     if isinstance(geometry, str):
-                        decoded_geometry = openrouteservice.convert.decode_polyline(geometry)
-                        coords = decoded_geometry['coordinates']
+                        coords = _decode_polyline(geometry)
                     else:
                         # Already decoded coordinates
                         coords = geometry['coordinates'] if 'coordinates' in geometry else geometry
@@ -180,12 +410,6 @@ class RealWorldRouteOptimizer:
         Uses route options, avoid_polygons, and preference parameters to find real alternatives.
         """
         alternatives = []
-        url = 'https://api.openrouteservice.org/v2/directions/driving-car'
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8',
-            'Accept': 'application/json, application/geo+json',
-            'Authorization': self.api_key
-        }
         
         lat1, lng1 = point1['lat'], point1['lng']
         lat2, lng2 = point2['lat'], point2['lng']
@@ -198,121 +422,36 @@ class RealWorldRouteOptimizer:
         if haversine_dist > 5000:
             print(f"⚠️  Warning: Very long route ({haversine_dist:.0f} km). Route may cross continents.")
         
-        # Strategy 1: Get the direct/fastest route first
-        try:
-            payload = {
-                'coordinates': [[lng1, lat1], [lng2, lat2]],
-                'preference': 'fastest'
-            }
-            response = requests.post(url, json=payload, headers=headers, timeout=self.timeout)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'routes' in data and len(data['routes']) > 0:
-                route = data['routes'][0]
-                summary = route['summary']
-                distance_km = summary['distance'] / 1000
-                geometry = route['geometry']
-                
-                if isinstance(geometry, str):
-                    decoded_geometry = openrouteservice.convert.decode_polyline(geometry)
-                    coords_list = decoded_geometry['coordinates']
-                else:
-                    coords_list = geometry['coordinates'] if 'coordinates' in geometry else geometry
-                
-                alternatives.append((distance_km, {
-                    'distance': distance_km,
-                    'duration': summary['duration'] / 60,
-                    'geometry': coords_list,
-                    'legs': route.get('segments', []),
-                    'provider': 'OpenRouteService',
-                    'route_type': 'fastest'
-                }))
-                print(f"Generated fastest route: {distance_km:.2f} km")
-        except Exception as e:
-            print(f"Could not generate fastest route: {e}")
-        
-        # Strategy 2: Try shortest distance route (different from fastest)
-        if len(alternatives) < max_alternatives:
-            try:
-                payload = {
-                    'coordinates': [[lng1, lat1], [lng2, lat2]],
-                    'preference': 'shortest'
-                }
-                response = requests.post(url, json=payload, headers=headers, timeout=self.timeout)
-                response.raise_for_status()
-                data = response.json()
-                
-                if 'routes' in data and len(data['routes']) > 0:
-                    route = data['routes'][0]
-                    summary = route['summary']
-                    distance_km = summary['distance'] / 1000
-                    
-                    # Only add if significantly different from fastest route
-                    if not alternatives or abs(distance_km - alternatives[0][0]) > 5:
-                        geometry = route['geometry']
-                        if isinstance(geometry, str):
-                            decoded_geometry = openrouteservice.convert.decode_polyline(geometry)
-                            coords_list = decoded_geometry['coordinates']
-                        else:
-                            coords_list = geometry['coordinates'] if 'coordinates' in geometry else geometry
-                        
-                        alternatives.append((distance_km, {
-                            'distance': distance_km,
-                            'duration': summary['duration'] / 60,
-                            'geometry': coords_list,
-                            'legs': route.get('segments', []),
-                            'provider': 'OpenRouteService',
-                            'route_type': 'shortest'
-                        }))
-                        print(f"Generated shortest route: {distance_km:.2f} km")
-            except Exception as e:
-                print(f"Could not generate shortest route: {e}")
-        
-        # Strategy 3: Avoid highways to find local roads alternative
-        if len(alternatives) < max_alternatives:
-            try:
-                payload = {
-                    'coordinates': [[lng1, lat1], [lng2, lat2]],
-                    'options': {
-                        'avoid_features': ['highways']
-                    }
-                }
-                response = requests.post(url, json=payload, headers=headers, timeout=self.timeout)
-                response.raise_for_status()
-                data = response.json()
-                
-                if 'routes' in data and len(data['routes']) > 0:
-                    route = data['routes'][0]
-                    summary = route['summary']
-                    distance_km = summary['distance'] / 1000
-                    
-                    # Only add if significantly different
-                    is_different = True
-                    for alt_dist, _ in alternatives:
-                        if abs(distance_km - alt_dist) < 5:
-                            is_different = False
-                            break
-                    
-                    if is_different:
-                        geometry = route['geometry']
-                        if isinstance(geometry, str):
-                            decoded_geometry = openrouteservice.convert.decode_polyline(geometry)
-                            coords_list = decoded_geometry['coordinates']
-                        else:
-                            coords_list = geometry['coordinates'] if 'coordinates' in geometry else geometry
-                        
-                        alternatives.append((distance_km, {
-                            'distance': distance_km,
-                            'duration': summary['duration'] / 60,
-                            'geometry': coords_list,
-                            'legs': route.get('segments', []),
-                            'provider': 'OpenRouteService',
-                            'route_type': 'no_highways'
-                        }))
-                        print(f"Generated no-highways route: {distance_km:.2f} km")
-            except Exception as e:
-                print(f"Could not generate no-highways route: {e}")
+        # The three strategies are independent requests: issue them concurrently,
+        # then keep them in order of preference if they differ enough
+        coordinates = [[lng1, lat1], [lng2, lat2]]
+        strategies = [
+            ('fastest', {'preference': 'fastest'}),
+            ('shortest', {'preference': 'shortest'}),            # different from fastest
+            ('no_highways', {'options': {'avoid_features': ['highways']}}),  # local roads
+        ]
+        with ThreadPoolExecutor(max_workers=len(strategies)) as executor:
+            fastest, shortest, no_highways = executor.map(
+                lambda strategy: self._ors_route_option({'coordinates': coordinates, **strategy[1]}, strategy[0]),
+                strategies
+            )
+        
+        # Strategy 1: the direct/fastest route
+        if fastest:
+            alternatives.append(fastest)
+        
+        # Strategy 2: shortest distance, only if significantly different from fastest
+        if shortest and len(alternatives) < max_alternatives:
+            if not alternatives or abs(shortest[0] - alternatives[0][0]) > 5:
+                alternatives.append(shortest)
+        
+        # Strategy 3: avoid highways, only if significantly different from both
+        if no_highways and len(alternatives) < max_alternatives:
+            if all(abs(no_highways[0] - alt_dist) >= 5 for alt_dist, _ in alternatives):
+                alternatives.append(no_highways)
+        
+        for distance_km, route_data in alternatives:
+            print(f"Generated {route_data['route_type'].replace('_', '-')} route: {distance_km:.2f} km")
         
         if not alternatives:
             # Fallback to single best route
@@ -322,42 +461,55 @@ class RealWorldRouteOptimizer:
         
         return alternatives
     
+    def _ors_route_option(self, payload: Dict, route_type: str) -> Optional[Tuple[float, Dict]]:
+        """
+        One directions request for an alternative-route strategy
+        Returns: (distance_in_km, route_data), or None if ORS gave no route
+        """
+        try:
+            response = self._ors_post(ORS_DIRECTIONS_URL, payload)
+            response.raise_for_status()
+            data = _response_json(response)
+            
+            if not ('routes' in data and len(data['routes']) > 0):
+                return None
+            
+            route = data['routes'][0]
+            summary = route['summary']
+            distance_km = summary['distance'] / 1000
+            geometry = route['geometry']
+            
+            if isinstance(geometry, str):
+                coords_list = _decode_polyline(geometry)
+            else:
+                coords_list = geometry['coordinates'] if 'coordinates' in geometry else geometry
+            
+            return distance_km, {
+                'distance': distance_km,
+                'duration': summary['duration'] / 60,
+                'geometry': coords_list,
+                'legs': route.get('segments', []),
+                'provider': 'OpenRouteService',
+                'route_type': route_type
+            }
+        except Exception as e:
+            print(f"Could not generate {route_type.replace('_', '-')} route: {e}")
+            return None
+    
     def _ors_distance(self, point1: Dict, point2: Dict) -> Tuple[float, Dict]:
         """
         Get distance using OpenRouteService.
         This uses actual road networks for accurate routing.
         """
-        coords = ((point1['lng'], point1['lat']), (point2['lng'], point2['lat']))
-        
         try:
-            # Request directions
-            routes = self.client.directions(
-                coordinates=coords,
-                profile='driving-car',
-                format='json',
-                radiuses=10000, # Increase radius for better matching
-                geometry='true'
+            # Request directions (memoized process-wide)
+            return _cached_ors_route(
+                self.session, self.api_key, self.timeout,
+                round(point1['lat'], 5), round(point1['lng'], 5),
+                round(point2['lat'], 5), round(point2['lng'], 5)
             )
-            
-            if routes and 'routes' in routes and len(routes['routes']) > 0:
-                route = routes['routes'][0]
-                summary = route['summary']
-                distance_km = summary['distance'] / 1000
-                
-                # Decode polyline geometry
-                decoded_geometry = openrouteservice.convert.decode_polyline(route['geometry'])
-                
-                return distance_km, {
-                    'distance': distance_km,
-                    'duration': summary['duration'] / 60,  # in minutes
-                    'geometry': decoded_geometry['coordinates'], # Return decoded coordinates
-                    'legs': route.get('segments', []),
-                    'provider': 'OpenRouteService'
-                }
-            else:
-                raise Exception("No route found by OpenRouteService")
         
-        except openrouteservice.exceptions.ApiError as e:
+        except requests.exceptions.RequestException as e:
             # API error - use fallback
             if self.fallback_to_haversine:
                 return self._haversine_distance(point1, point2)
@@ -373,16 +525,12 @@ class RealWorldRouteOptimizer:
         Calculate straight-line distance between coordinates using Haversine formula
         Returns distance in kilometers
         """
-        R = 6371  # Earth's radius in km
-        lat1_rad, lon1_rad = math.radians(lat1), math.radians(lng1)
-        lat2_rad, lon2_rad = math.radians(lat2), math.radians(lng2)
-        
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
+        lat1_rad, lat2_rad = math.radians(lat1), math.radians(lat2)
+        sin_dlat = math.sin((lat2_rad - lat1_rad) * 0.5)
+        sin_dlon = math.sin(math.radians(lng2 - lng1) * 0.5)
         
-        a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
-        c = 2 * math.asin(math.sqrt(a))
-        return R * c
+        a = sin_dlat * sin_dlat + math.cos(lat1_rad) * math.cos(lat2_rad) * sin_dlon * sin_dlon
+        return 12742.0 * math.asin(math.sqrt(a))  # Earth's diameter (2 * 6371 km)
     
     def _haversine_distance(self, point1: Dict, point2: Dict) -> Tuple[float, Dict]:
         """
@@ -391,9 +539,7 @@ class RealWorldRouteOptimizer:
         """
         distance_km = self._haversine_distance_coords(point1['lat'], point1['lng'], point2['lat'], point2['lng'])
         
-        # Add road factor (actual roads are ~1.2-1.5x longer than straight line)
-        road_factor = 1.3
-        adjusted_distance = distance_km * road_factor
+        adjusted_distance = distance_km * HAVERSINE_ROAD_FACTOR
         
         return adjusted_distance, {
             'distance': adjusted_distance,
@@ -405,80 +551,111 @@ class RealWorldRouteOptimizer:
     def calculate_distance_matrix_real(self, waypoints: List[Dict]) -> Tuple[np.ndarray, Dict]:
         """
         Calculate actual road distance matrix for all waypoint pairs
-        Uses real routing data instead of straight-line distances
+        Uses a single ORS matrix request instead of one routing call per pair.
+        Route geometry is not part of the matrix; it is fetched lazily (and cached)
+        through get_real_distance only for the legs that end up being displayed.
+        Returns: (distance_matrix_km, {'durations': duration_matrix_minutes})
         """
-        n = len(waypoints)
-        matrix = np.zeros((n, n))
-        route_data = {}
+        # Waypoints at the same rounded location (e.g. a depot given twice) share
+        # one row/column: compute the matrix on distinct locations and scatter back
+        location_index = {}
+        unique = []
+        inverse = []
+        for w in waypoints:
+            key = _location_key(w)
+            if key not in location_index:
+                location_index[key] = len(unique)
+                unique.append(w)
+            inverse.append(location_index[key])
+        
+        if len(unique) < len(waypoints):
+            matrix, info = self.calculate_distance_matrix_real(unique)
+            grid = np.ix_(inverse, inverse)
+            return matrix[grid], {'durations': info['durations'][grid]}
         
+        n = len(waypoints)
         print(f"Calculating real-world distance matrix for {n} waypoints using OpenRouteService...")
         
-        # Calculate pairwise distances using directions API
-        # Note: We use individual route calls instead of matrix endpoint
-        for i in range(n):
-            for j in range(n):
-                if i == j:
-                    matrix[i][j] = 0
-                else:
-                    try:
-                        distance, route_info = self.get_real_distance(waypoints[i], waypoints[j])
-                        matrix[i][j] = distance
-                    except Exception as e:
-                        # Silently fallback to Haversine (API might be unavailable)
-                        distance, _ = self._haversine_distance(waypoints[i], waypoints[j])
-                        matrix[i][j] = distance
-        
-        return matrix, {}
-
-        # Old matrix endpoint code (not available in free tier)
         try:
-            if False:  # Disabled - matrix endpoint not available
-                matrix_result = self.client.matrix(
-                    locations=locations,
-                    metrics=['distance', 'duration'],
-                    profile='driving-car'
-                )
-                
-                distances = np.array(matrix_result['distances']) / 1000 # Convert to km
-                
-                # Now, get the detailed route geometry for the final path later
-                # This part will be handled after optimization
-                
-                # For now, we just return the distance matrix
-                return distances, {'durations': matrix_result['durations']}
-
-        except openrouteservice.exceptions.ApiError as e:
+            return self._ors_matrix(waypoints)
+        except (requests.ConnectionError, requests.Timeout):
+            # Already retried by the session: ORS is unreachable, and n² pairwise
+            # calls would only repeat the wait before degrading to Haversine
+            raise
+        except requests.HTTPError as e:
+            # Transient errors were already retried, and auth/other client errors
+            # (401, 403, 404, ...) would fail the same way on every pairwise call
+            if e.response is None or e.response.status_code not in MATRIX_LIMIT_STATUSES:
+                raise
             print(f"ORS Matrix API error: {e}. Falling back to pairwise calculation.")
-            # Fallback to pairwise if matrix fails
-            for i in range(n):
-                for j in range(i + 1, n):
-                    if i != j:
-                        try:
-                            dist, _ = self.get_real_distance(waypoints[i], waypoints[j])
-                            matrix[i][j] = dist
-                            matrix[j][i] = dist
-                        except Exception as e_pair:
-                            print(f"Failed to get distance {i}->{j}: {e_pair}")
-                            dist_fallback = self._haversine_simple(waypoints[i], waypoints[j]) * 1.3
-                            matrix[i][j] = dist_fallback
-                            matrix[j][i] = dist_fallback
-            return matrix, {}
         except Exception as e:
-            print(f"An unexpected error occurred with matrix calculation: {e}")
-            # Fallback to pairwise if matrix fails
-            for i in range(n):
-                for j in range(i + 1, n):
-                     if i != j:
-                        try:
-                            dist, _ = self.get_real_distance(waypoints[i], waypoints[j])
-                            matrix[i][j] = dist
-                            matrix[j][i] = dist
-                        except Exception as e_pair:
-                            print(f"Failed to get distance {i}->{j}: {e_pair}")
-                            dist_fallback = self._haversine_simple(waypoints[i], waypoints[j]) * 1.3
-                            matrix[i][j] = dist_fallback
-                            matrix[j][i] = dist_fallback
-            return matrix, {}
+            print(f"ORS Matrix API error: {e}. Falling back to pairwise calculation.")
+        
+        # Fallback: pairwise directions calls issued concurrently, one per unordered
+        # pair unless assume_symmetric is off (get_real_distance handles Haversine fallback)
+        matrix = np.zeros((n, n))
+        durations = np.zeros((n, n))
+        if self.assume_symmetric:
+            pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        else:
+            pairs = [(i, j) for i in range(n) for j in range(n) if i != j]
+        results = self.get_real_distances([(waypoints[i], waypoints[j]) for i, j in pairs],
+                                          max_workers=MAX_CONCURRENT_REQUESTS)
+        for (i, j), (distance, route_info) in zip(pairs, results):
+            matrix[i][j] = distance
+            durations[i][j] = route_info.get('duration', 0)
+            if self.assume_symmetric:
+                matrix[j][i] = distance
+                durations[j][i] = durations[i][j]
+        
+        return matrix, {'durations': durations}
+    
+    def _ors_matrix(self, waypoints: List[Dict]) -> Tuple[np.ndarray, Dict]:
+        """
+        Get the full distance/duration matrix from the OpenRouteService matrix API
+        in one request, or one per block of source rows when n² exceeds
+        ORS_MATRIX_MAX_ELEMENTS. Unroutable pairs (null in the response) use Haversine.
+        """
+        n = len(waypoints)
+        locations = [[w['lng'], w['lat']] for w in waypoints]
+        rows_per_request = max(1, ORS_MATRIX_MAX_ELEMENTS // n)
+        
+        distance_blocks, duration_blocks = [], []
+        for start in range(0, n, rows_per_request):
+            payload = {'locations': locations, 'metrics': ['distance', 'duration']}
+            if rows_per_request < n:
+                payload['sources'] = list(range(start, min(start + rows_per_request, n)))
+            
+            response = self._ors_post(ORS_MATRIX_URL, payload)
+            response.raise_for_status()
+            data = _response_json(response)
+            distance_blocks.extend(data['distances'])
+            duration_blocks.extend(data['durations'])
+        
+        # null entries become NaN
+        distances = np.array(distance_blocks, dtype=float) / 1000  # meters -> km
+        durations = np.array(duration_blocks, dtype=float) / 60    # seconds -> minutes
+        
+        unroutable = np.isnan(distances) | np.isnan(durations)
+        if unroutable.any():
+            fallback = self._haversine_matrix(waypoints)  # km, and minutes at 60 km/h
+            distances[unroutable] = fallback[unroutable]
+            durations[unroutable] = fallback[unroutable]
+        
+        return distances, {'durations': durations}
+    
+    @staticmethod
+    def _haversine_matrix(waypoints: List[Dict]) -> np.ndarray:
+        """
+        Road-adjusted Haversine distances (km) between all waypoint pairs in one
+        vectorized pass; matches _haversine_distance entry for entry
+        """
+        lat = np.radians([w['lat'] for w in waypoints])
+        lng = np.radians([w['lng'] for w in waypoints])
+        dlat = lat[:, None] - lat[None, :]
+        dlng = lng[:, None] - lng[None, :]
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+        return 6371 * 2 * np.arcsin(np.sqrt(a)) * HAVERSINE_ROAD_FACTOR
 
     @staticmethod
     def _haversine_simple(point1: Dict, point2: Dict) -> float:
@@ -504,16 +681,18 @@ class TSPSolver:
         Nearest neighbor heuristic for TSP
         Good for quick approximations
         """
+        distance_matrix = np.asarray(distance_matrix, dtype=float)
         n = len(distance_matrix)
-        unvisited = set(range(n))
+        unvisited_mask = np.ones(n, dtype=bool)
         current = start_idx
         path = [current]
-        unvisited.remove(current)
+        unvisited_mask[current] = False
         
-        while unvisited:
-            nearest = min(unvisited, key=lambda x: distance_matrix[current][x])
+        for _ in range(n - 1):
+            # Closest unvisited city (lowest index on ties)
+            nearest = int(np.argmin(np.where(unvisited_mask, distance_matrix[current], np.inf)))
             path.append(nearest)
-            unvisited.remove(nearest)
+            unvisited_mask[nearest] = False
             current = nearest
         
         return path
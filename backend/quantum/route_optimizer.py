@@ -2,16 +2,151 @@ import numpy as np
 import json
 import math
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Tuple
 
 try:
     from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
+    from qiskit.circuit import Parameter
     from qiskit_aer import AerSimulator
     QISKIT_AVAILABLE = True
 except ImportError:
     QISKIT_AVAILABLE = False
     # Suppress warning - will use simulation mode
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in so JIT-decorated helpers still import without Numba"""
+        return lambda func: func
+
+try:
+    import numexpr as ne
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+
+
+# Distance matrices kept for recently seen waypoint sets
+DISTANCE_MATRIX_CACHE_SIZE = 128
+
+# Independently seeded WOA runs per optimization, sharing one chain's iteration
+# budget between them; the lowest-cost one wins
+WOA_RESTARTS = 4
+
+# Up to this many waypoints the best index is read straight off the row sums
+EXACT_MAX_WAYPOINTS = 3
+
+# Fewest shots any exploration angle is sampled with
+MIN_SHOTS = 64
+
+# Waypoint count from which the arc conversion of the distance matrix runs in threaded numexpr
+# (below it, or with a single thread, NumPy's own kernels are faster)
+NUMEXPR_MIN_WAYPOINTS = 500
+
+
+@njit(cache=True)
+def nn_path(distance_matrix: np.ndarray) -> np.ndarray:
+    """
+    Nearest neighbor path starting at waypoint 0 over a precomputed distance matrix
+    Output: visiting order as an int64 array
+    """
+    n = distance_matrix.shape[0]
+    visited = np.zeros(n, np.bool_)
+    path = np.empty(n, np.int64)
+    path[0] = 0
+    visited[0] = True
+    current = 0
+    
+    for k in range(1, n):
+        nearest_idx = -1
+        nearest_dist = np.inf
+        for j in range(n):
+            if not visited[j] and distance_matrix[current, j] < nearest_dist:
+                nearest_dist = distance_matrix[current, j]
+                nearest_idx = j
+        path[k] = nearest_idx
+        visited[nearest_idx] = True
+        current = nearest_idx
+    
+    return path
+
+
+@njit(cache=True)
+def _sim_probs(angle: float, n: int) -> np.ndarray:
+    """
+    Simulated exploration distribution over n waypoints for one rotation angle
+    Output: normalized probabilities indexed by waypoint
+    """
+    idx = np.arange(n)
+    p = (1 + np.cos(angle + 2 * np.pi * idx / n)) / (2 * n)
+    return p / p.sum()
+
+
+if NUMBA_AVAILABLE:
+    # Compile (or load from cache) at import so the first request doesn't pay for it
+    nn_path(np.zeros((3, 3)))
+    nn_path(np.zeros((3, 3), dtype=np.float32))  # the optimizer's matrices are float32
+    _sim_probs(0.0, 3)
+
+
+@lru_cache(maxsize=None)
+def _aer_simulator():
+    """
+    Shared Aer simulator for QiskitQuantumOptimizer: statevector on the GPU when
+    this Aer build has one (qiskit-aer-gpu), the default CPU simulator otherwise
+    """
+    simulator = AerSimulator()
+    if 'GPU' in simulator.available_devices():
+        return AerSimulator(method='statevector', device='GPU')
+    return simulator
+
+
+def _aer_run_options() -> Dict:
+    """Extra run() options for batched jobs on the shared simulator"""
+    if _aer_simulator().options.device == 'GPU':
+        # Sample all shots of a batch in one kernel launch
+        return {'batched_shots_gpu': True}
+    return {'max_parallel_experiments': 0}
+
+
+@lru_cache(maxsize=None)
+def _exploration_ansatz(num_qubits: int):
+    """
+    Exploration circuit with the rotation angle as a Parameter, transpiled once per
+    qubit count. Returns (theta, transpiled circuit); bind theta per angle.
+    """
+    theta = Parameter('θ')
+    qr = QuantumRegister(num_qubits, 'q')
+    cr = ClassicalRegister(num_qubits, 'c')
+    qc = QuantumCircuit(qr, cr)
+    
+    # Initial superposition with Hadamard
+    for i in range(num_qubits):
+        qc.h(qr[i])
+    
+    # Problem-dependent ansatz with RX rotations
+    for i in range(num_qubits):
+        qc.rx(theta, qr[i])
+    
+    # Cost-inspired phase rotation
+    for i in range(num_qubits - 1):
+        qc.cx(qr[i], qr[i + 1])
+    
+    for i in range(num_qubits):
+        qc.rz(theta * 0.5, qr[i])
+    
+    # Measurement
+    for i in range(num_qubits):
+        qc.measure(qr[i], cr[i])
+    
+    return theta, transpile(qc, _aer_simulator())
+
 
 class QiskitQuantumOptimizer:
     """
@@ -23,120 +158,123 @@ class QiskitQuantumOptimizer:
         self.num_waypoints = num_waypoints
         self.max_iter = max_iter
         self.shots = shots
-        self.history = []
         self.qiskit_available = QISKIT_AVAILABLE
+        
+        # Per-iteration history, preallocated and written by index
+        self._cost = np.empty(max_iter)
+        self._angle = np.empty(max_iter)
+        self._recorded = 0
     
-    def create_quantum_circuit(self, angle: float) -> Dict:
+    @property
+    def history(self) -> List[Dict]:
+        """Per-iteration best cost and angle, built from the history arrays on demand"""
+        n = self._recorded
+        return [
+            {'iteration': iteration, 'cost': cost, 'angle': angle}
+            for iteration, (cost, angle) in enumerate(zip(self._cost[:n].tolist(), self._angle[:n].tolist()))
+        ]
+    
+    def create_quantum_circuit(self, angle: float) -> np.ndarray:
         """
         Create a parameterized quantum circuit for QAOA-like exploration
         Uses rotation gates to explore solution space
         """
+        return self.create_quantum_circuits([angle])[0]
+    
+    def create_quantum_circuits(self, angles: List[float], shots: List[int] = None) -> List[np.ndarray]:
+        """
+        Run the exploration circuit for every angle, one Aer job per distinct shot count
+        shots: per-angle shot counts (default: self.shots for every angle)
+        Output: one probability array (indexed by waypoint) per angle, in order
+        """
         if not self.qiskit_available:
-            return self._simulate_quantum_circuit(angle)
+            return [self._simulate_quantum_circuit(angle) for angle in angles]
+        
+        if shots is None:
+            shots = [self.shots] * len(angles)
         
         try:
-            # Create quantum circuit with enough qubits for waypoints
+            # Enough qubits for waypoints; the circuit is built and transpiled once
             num_qubits = min(self.num_waypoints, 10)  # Limit to 10 qubits for simulation
-            qr = QuantumRegister(num_qubits, 'q')
-            cr = ClassicalRegister(num_qubits, 'c')
-            qc = QuantumCircuit(qr, cr)
-            
-            # Initial superposition with Hadamard
-            for i in range(num_qubits):
-                qc.h(qr[i])
-            
-            # Problem-dependent ansatz with RX rotations
-            for i in range(num_qubits):
-                qc.rx(angle, qr[i])
+            theta, ansatz = _exploration_ansatz(num_qubits)
             
-            # Cost-inspired phase rotation
-            for i in range(num_qubits - 1):
-                qc.cx(qr[i], qr[i + 1])
-            
-            for i in range(num_qubits):
-                qc.rz(angle * 0.5, qr[i])
-            
-            # Measurement
-            for i in range(num_qubits):
-                qc.measure(qr[i], cr[i])
-            
-            # Simulate circuit
-            simulator = AerSimulator()
-            transpiled = transpile(qc, simulator)
-            job = simulator.run(transpiled, shots=self.shots)
-            result = job.result()
-            counts = result.get_counts()
-            
-            # Convert bitstring counts to probabilities
-            probabilities = {}
-            for bitstring, count in counts.items():
-                prob = count / self.shots
-                idx = int(bitstring, 2) % self.num_waypoints
-                probabilities[idx] = probabilities.get(idx, 0) + prob
+            # Bind each angle and simulate each shot tier in one submission (across cores, or on the GPU)
+            probabilities = [None] * len(angles)
+            for tier in sorted(set(shots)):
+                members = [i for i, s in enumerate(shots) if s == tier]
+                circuits = [ansatz.assign_parameters({theta: angles[i]}, inplace=False) for i in members]
+                result = _aer_simulator().run(circuits, shots=tier, **_aer_run_options()).result()
+                
+                for k, i in enumerate(members):
+                    # Raw hex-keyed counts; get_counts() would reformat every key as a bitstring first
+                    probabilities[i] = self._counts_to_probabilities(result.data(k)['counts'], tier)
             
             return probabilities
         
         except Exception as e:
             print(f"Qiskit error: {e}, falling back to simulation", file=sys.stderr)
-            return self._simulate_quantum_circuit(angle)
+            return [self._simulate_quantum_circuit(angle) for angle in angles]
     
-    def _simulate_quantum_circuit(self, angle: float) -> Dict:
+    def _counts_to_probabilities(self, counts: Dict, shots: int) -> np.ndarray:
+        """Convert Aer's hex-keyed counts (out of shots) to probabilities per waypoint index"""
+        idx = np.fromiter((int(key, 16) for key in counts), dtype=np.int64, count=len(counts))
+        count = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        
+        # Several bitstrings fold onto the same waypoint; bincount sums them per index
+        return np.bincount(idx % self.num_waypoints, weights=count / shots, minlength=self.num_waypoints)
+    
+    def _shot_schedule(self) -> List[int]:
+        """
+        Shots per iteration, growing with the iteration towards self.shots
+        Rounded down to powers of two so only a handful of Aer jobs are needed
+        """
+        schedule = []
+        for iteration in range(self.max_iter):
+            shots = max(MIN_SHOTS, int(self.shots * (iteration + 1) / self.max_iter))
+            schedule.append(min(self.shots, 1 << (shots.bit_length() - 1)))
+        return schedule
+    
+    def _simulate_quantum_circuit(self, angle: float) -> np.ndarray:
         """
         Simulate quantum behavior without Qiskit
         Uses mathematical approximation of quantum superposition
         """
-        probabilities = {}
-        
-        # Simulate superposition using trigonometric functions
-        for i in range(self.num_waypoints):
-            # Parameterized rotation
-            prob = (1 + math.cos(angle + (2 * math.pi * i) / self.num_waypoints)) / (2 * self.num_waypoints)
-            probabilities[i] = prob
-        
-        # Normalize
-        total = sum(probabilities.values())
-        probabilities = {k: v / total for k, v in probabilities.items()}
-        
-        return probabilities
+        return _sim_probs(angle, self.num_waypoints)
     
-    def optimize(self, distance_matrix: np.ndarray) -> Tuple[int, float, List]:
+    def optimize(self, distance_matrix: np.ndarray, row_sums: np.ndarray = None) -> Tuple[int, float, List]:
         """
         Quantum annealing optimization using parameterized circuits
         Explores solution space with quantum advantage
+        row_sums: distance_matrix.sum(axis=1), if the caller already has it
         """
+        if row_sums is None:
+            row_sums = distance_matrix.sum(axis=1)
+        
         best_route_idx = 0
         best_cost = float('inf')
         
-        # Scale angle from 0 to 2π over iterations
-        for iteration in range(self.max_iter):
-            angle = (math.pi * 2) * (iteration / self.max_iter)
-            
-            # Get quantum probabilities for this angle
-            probabilities = self.create_quantum_circuit(angle)
-            
+        # Scale angle from 0 to 2π over iterations; early, coarse angles get fewer shots
+        angles = [(math.pi * 2) * (iteration / self.max_iter) for iteration in range(self.max_iter)]
+        batch = self.create_quantum_circuits(angles, self._shot_schedule())
+        
+        for iteration, (angle, probabilities) in enumerate(zip(angles, batch)):
             # Evaluate route based on quantum probabilities
-            cost = self._evaluate_route(probabilities, distance_matrix)
+            cost = self._evaluate_route(probabilities, row_sums)
             
             # Track best solution
             if cost < best_cost:
                 best_cost = cost
-                best_route_idx = max(probabilities, key=probabilities.get)
+                best_route_idx = int(np.argmax(probabilities))
             
-            self.history.append({
-                'iteration': iteration,
-                'cost': best_cost,
-                'angle': angle
-            })
+            self._cost[iteration] = best_cost
+            self._angle[iteration] = angle
         
+        self._recorded = self.max_iter
         return best_route_idx, best_cost, self.history
     
-    def _evaluate_route(self, probabilities: Dict, distance_matrix: np.ndarray) -> float:
-        """Evaluate cost of route based on probability distribution"""
-        cost = 0
-        for idx, prob in probabilities.items():
-            if idx < len(distance_matrix):
-                cost += prob * np.sum(distance_matrix[idx])
-        return cost
+    def _evaluate_route(self, probabilities: np.ndarray, row_sums: np.ndarray) -> float:
+        """Evaluate cost of route based on probability distribution (row_sums: matrix row sums)"""
+        return float(probabilities @ row_sums)
 
 
 class WhaleOptimizationExploiter:
@@ -145,72 +283,89 @@ class WhaleOptimizationExploiter:
     Refines quantum solution using nature-inspired heuristic
     """
     
-    def __init__(self, max_iter: int = 50, num_agents: int = 5):
+    def __init__(self, max_iter: int = 50, num_agents: int = 5, rng: np.random.Generator = None):
         self.max_iter = max_iter
         self.num_agents = num_agents
-        self.history = []
+        self.rng = rng if rng is not None else np.random.default_rng()
+        
+        # Per-iteration best cost, preallocated and written by index
+        self._cost = np.empty(max_iter)
+        self._recorded = 0
+        
+        # Final agent positions of the last run (float32)
+        self.positions = None
     
-    def optimize(self, distance_matrix: np.ndarray, initial_solution: int = None) -> Tuple[int, float, List]:
+    @property
+    def history(self) -> List[Dict]:
+        """Per-iteration best cost, built from the history array on demand"""
+        return [{'iteration': iteration, 'cost': cost} for iteration, cost in enumerate(self._cost[:self._recorded].tolist())]
+    
+    def optimize(self, distance_matrix: np.ndarray, initial_solution: int = None,
+                 row_sums: np.ndarray = None) -> Tuple[int, float, List]:
         """
         WOA optimization for exploitation
         Refines the quantum solution
+        row_sums: distance_matrix.sum(axis=1), if the caller already has it
         """
         num_waypoints = len(distance_matrix)
+        if row_sums is None:
+            row_sums = distance_matrix.sum(axis=1)
+        row_sums = np.asarray(row_sums, dtype=np.float32)
         
-        # Initialize agent positions (routes)
-        positions = np.random.uniform(0, 1, (self.num_agents, num_waypoints))
+        # Initialize agent positions (routes); everything below stays float32 like the distance matrix
+        positions = self.rng.uniform(0, 1, (self.num_agents, num_waypoints)).astype(np.float32, copy=False)
         positions = positions / positions.sum(axis=1, keepdims=True)
         
         # Best position tracking
         if initial_solution is not None:
-            best_position = np.zeros(num_waypoints)
+            best_position = np.zeros(num_waypoints, dtype=np.float32)
             best_position[initial_solution] = 1.0
         else:
             best_position = positions[0].copy()
         
-        best_cost = self._evaluate_cost(best_position, distance_matrix)
+        best_cost = self._evaluate_cost(best_position, row_sums)
+        
+        # All randomness drawn up front: per-agent coefficients and random-agent picks for every iteration
+        R = self.rng.random((self.max_iter, self.num_agents), dtype=np.float32)
+        RI = self.rng.integers(0, self.num_agents, (self.max_iter, self.num_agents))
         
         for iteration in range(self.max_iter):
             # WOA parameters
-            a = 2 - iteration * (2 / self.max_iter)
+            a = np.float32(2 - iteration * (2 / self.max_iter))
             
-            for i in range(self.num_agents):
-                r = np.random.random()
-                A = 2 * a * r - a
-                C = 2 * r
-                
-                # Update position based on best position
-                if abs(A) < 1:
-                    D = np.abs(C * best_position - positions[i])
-                    positions[i] = best_position - A * D
-                else:
-                    # Update based on random agent
-                    random_idx = np.random.randint(0, self.num_agents)
-                    D = np.abs(C * positions[random_idx] - positions[i])
-                    positions[i] = positions[random_idx] - A * D
-                
-                # Normalize position
-                positions[i] = np.clip(positions[i], 0, 1)
-                positions[i] = positions[i] / positions[i].sum()
-                
-                # Evaluate
-                cost = self._evaluate_cost(positions[i], distance_matrix)
-                
-                if cost < best_cost:
-                    best_cost = cost
-                    best_position = positions[i].copy()
+            # Per-agent coefficients, as columns so they broadcast over waypoints
+            r = R[iteration][:, None]
+            A = 2 * a * r - a
+            C = 2 * r
             
-            self.history.append({
-                'iteration': iteration,
-                'cost': best_cost
-            })
+            # Encircle the best position when |A| < 1, otherwise move relative to a random agent
+            rand_refs = positions[RI[iteration]]
+            D_best = np.abs(C * best_position - positions)
+            D_rand = np.abs(C * rand_refs - positions)
+            positions = np.where(np.abs(A) < 1, best_position - A * D_best, rand_refs - A * D_rand)
+            
+            # Normalize positions
+            positions = np.clip(positions, 0, 1)
+            positions /= positions.sum(axis=1, keepdims=True)
+            
+            # Evaluate every agent at once (all-zero rows normalize to NaN and never win)
+            costs = positions @ row_sums
+            i = int(np.argmin(np.where(np.isnan(costs), np.inf, costs)))
+            
+            if costs[i] < best_cost:
+                best_cost = float(costs[i])
+                best_position = positions[i].copy()
+            
+            self._cost[iteration] = best_cost
         
+        self._recorded = self.max_iter
+        self.positions = positions
         best_idx = np.argmax(best_position)
         return int(best_idx), best_cost, self.history
     
-    def _evaluate_cost(self, position: np.ndarray, distance_matrix: np.ndarray) -> float:
-        """Calculate cost of route"""
-        return np.sum(position * distance_matrix.sum(axis=1))
+    def _evaluate_cost(self, position: np.ndarray, row_sums: np.ndarray) -> float:
+        """Calculate cost of route (row_sums: matrix row sums)"""
+        return float(position @ row_sums)
 
 
 class HybridRouteOptimizer:
@@ -229,8 +384,8 @@ class HybridRouteOptimizer:
         Input: list of waypoints with 'lat' and 'lng'
         Output: optimized route with detailed results
         """
-        # Calculate distance matrix
-        distance_matrix = self._calculate_distance_matrix(waypoints)
+        # Distance matrix and its row sums (shared by every cost evaluation), memoized per waypoint set
+        distance_matrix, row_sums = _cached_distance_matrix(_coords_key(waypoints))
         
         result = {
             'waypoints': waypoints,
@@ -241,10 +396,30 @@ class HybridRouteOptimizer:
             'total_distance': None
         }
         
-        if use_quantum:
-            # Phase 1: Quantum Annealing for exploration
+        if len(waypoints) <= EXACT_MAX_WAYPOINTS:
+            # Tiny inputs: the exact argmin is cheaper than either search phase
+            best_idx = int(np.argmin(row_sums))
+            
+            result['optimization_phases'].append({
+                'name': 'Exact Search',
+                'best_index': best_idx,
+                'best_cost': float(row_sums[best_idx]),
+                'history': []
+            })
+            
+            result['best_route_index'] = best_idx
+            result['best_cost'] = float(row_sums[best_idx])
+        elif use_quantum:
+            # Quantum Annealing (exploration) and WOA (exploitation) run concurrently;
+            # Aer and NumPy release the GIL for their heavy lifting. WOA cannot wait
+            # for QA's answer, so it is warm-started from the cheapest row instead
             qa = QiskitQuantumOptimizer(len(waypoints), max_iter=100, shots=1024)
-            qa_idx, qa_cost, qa_history = qa.optimize(distance_matrix)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                qa_future = executor.submit(qa.optimize, distance_matrix, row_sums)
+                woa_future = executor.submit(_woa_restarts, distance_matrix, row_sums, 50,
+                                             initial_solution=int(np.argmin(row_sums)))
+                qa_idx, qa_cost, qa_history = qa_future.result()
+                woa_idx, woa_cost, woa_history = woa_future.result()
             
             result['optimization_phases'].append({
                 'name': 'Quantum Annealing (Exploration)',
@@ -253,10 +428,6 @@ class HybridRouteOptimizer:
                 'history': qa_history
             })
             
-            # Phase 2: WOA for exploitation using quantum result as seed
-            woa = WhaleOptimizationExploiter(max_iter=50, num_agents=5)
-            woa_idx, woa_cost, woa_history = woa.optimize(distance_matrix, initial_solution=qa_idx)
-            
             result['optimization_phases'].append({
                 'name': 'Whale Optimization (Exploitation)',
                 'best_index': woa_idx,
@@ -273,8 +444,7 @@ class HybridRouteOptimizer:
                 result['best_cost'] = float(woa_cost)
         else:
             # Only WOA
-            woa = WhaleOptimizationExploiter(max_iter=100, num_agents=5)
-            woa_idx, woa_cost, woa_history = woa.optimize(distance_matrix)
+            woa_idx, woa_cost, woa_history = _woa_restarts(distance_matrix, row_sums, max_iter=100)
             
             result['optimization_phases'].append({
                 'name': 'Whale Optimization Only',
@@ -287,21 +457,13 @@ class HybridRouteOptimizer:
             result['best_cost'] = float(woa_cost)
         
         # Calculate total distance for best route
-        result['total_distance'] = float(np.sum(distance_matrix[result['best_route_index']]))
+        result['total_distance'] = float(row_sums[result['best_route_index']])
         
         return result
     
     def _calculate_distance_matrix(self, waypoints: List[Dict]) -> np.ndarray:
-        """Calculate Haversine distance matrix"""
-        n = len(waypoints)
-        matrix = np.zeros((n, n))
-        
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    matrix[i][j] = self._haversine(waypoints[i], waypoints[j])
-        
-        return matrix
+        """Calculate the great-circle distance matrix (all pairs in one vectorized pass, memoized)"""
+        return _cached_distance_matrix(_coords_key(waypoints))[0]
     
     @staticmethod
     def _haversine(point1: Dict, point2: Dict) -> float:
@@ -317,6 +479,78 @@ class HybridRouteOptimizer:
         c = 2 * math.asin(math.sqrt(a))
         
         return R * c
+    
+    @staticmethod
+    def _chord_matrix(coords: np.ndarray) -> np.ndarray:
+        """
+        Great-circle distance matrix (km, float32) from an (N, 2) array of [lat, lng] rows
+        Squared chord lengths between unit-sphere points come from one float64 product,
+        then 2R * arcsin(chord / 2) turns them into arcs in float32
+        """
+        R = 6371  # Earth's radius in km
+        lat, lng = np.radians(np.asarray(coords, dtype=np.float64)).T
+        cos_lat = np.cos(lat)
+        xyz = np.stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)], axis=-1)
+        
+        # |a - b|^2 = 2 - 2 a.b for unit vectors; only cast once the cancellation is done
+        chord = (2.0 - 2.0 * (xyz @ xyz.T)).astype(np.float32)
+        
+        if NUMEXPR_AVAILABLE and len(chord) >= NUMEXPR_MIN_WAYPOINTS and ne.get_num_threads() > 1:
+            # Clamp, sqrt and arcsin fused in one threaded pass over the n x n array
+            # (written back into the float32 array in place)
+            ne.evaluate(
+                '2 * R * arcsin(sqrt(where(chord > 0, where(chord < 4, chord, 4), 0)) * 0.5)',
+                local_dict={'R': R, 'chord': chord}, out=chord, casting='unsafe'
+            )
+            np.fill_diagonal(chord, 0)
+            return chord
+        
+        np.clip(chord, 0, 4, out=chord)
+        np.sqrt(chord, out=chord)
+        chord *= 0.5
+        np.arcsin(chord, out=chord)
+        chord *= 2 * R
+        np.fill_diagonal(chord, 0)
+        return chord
+
+
+def _woa_run(distance_matrix: np.ndarray, row_sums: np.ndarray, seed: int, max_iter: int,
+             initial_solution: int = None) -> Tuple[int, float, List]:
+    """One WOA run with its own seeded generator"""
+    woa = WhaleOptimizationExploiter(max_iter=max_iter, num_agents=5, rng=np.random.default_rng(seed))
+    return woa.optimize(distance_matrix, initial_solution=initial_solution, row_sums=row_sums)
+
+
+def _woa_restarts(distance_matrix: np.ndarray, row_sums: np.ndarray, max_iter: int,
+                  initial_solution: int = None) -> Tuple[int, float, List]:
+    """
+    WOA_RESTARTS independent WOA runs of max_iter / WOA_RESTARTS iterations each, one
+    after another: the same total work as a single max_iter chain (each run is a few ms
+    of GIL-bound NumPy, so a thread or process pool would only add overhead)
+    Output: (best_index, best_cost, history) of the lowest-cost run
+    """
+    iterations = max(1, max_iter // WOA_RESTARTS)
+    runs = [_woa_run(distance_matrix, row_sums, seed, iterations, initial_solution) for seed in range(WOA_RESTARTS)]
+    return min(runs, key=lambda run: run[1])
+
+
+def _coords_key(waypoints: List[Dict]) -> Tuple[Tuple[float, float], ...]:
+    """_cached_distance_matrix key: coordinates rounded to 6 decimals (~0.1 m)"""
+    return tuple((round(w['lat'], 6), round(w['lng'], 6)) for w in waypoints)
+
+
+@lru_cache(maxsize=DISTANCE_MATRIX_CACHE_SIZE)
+def _cached_distance_matrix(coords: Tuple[Tuple[float, float], ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Great-circle distance matrix and its row sums for a waypoint set, in float32
+    (metre-level precision is plenty for ranking routes, at half the memory traffic)
+    Both arrays are shared between callers, so they are returned read-only
+    """
+    distance_matrix = HybridRouteOptimizer._chord_matrix(np.array(coords, dtype=np.float64).reshape(-1, 2))
+    row_sums = distance_matrix.sum(axis=1)
+    distance_matrix.setflags(write=False)
+    row_sums.setflags(write=False)
+    return distance_matrix, row_sums
 
 
 # Main execution
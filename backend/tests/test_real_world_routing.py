@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'quantum'))
+
+import real_world_routing
+from real_world_routing import RealWorldRouteOptimizer, _RouteStore, _route_key
+
+
+class RouteStoreFallbackTest(unittest.TestCase):
+    """Straight-line fallbacks must never reach the route cache or the on-disk route store"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = _RouteStore(os.path.join(self.tmpdir.name, 'routes.sqlite3'))
+        self.router = RealWorldRouteOptimizer(api_key='test-key')
+        self.router.route_store = self.store
+        self.point1 = {'lat': 13.0827, 'lng': 80.2707}
+        self.point2 = {'lat': 11.9416, 'lng': 79.8083}
+
+    def tearDown(self):
+        self.store._conn.close()
+        self.tmpdir.cleanup()
+
+    def _stored_rows(self):
+        return self.store._conn.execute('SELECT COUNT(*) FROM routes').fetchone()[0]
+
+    def test_ors_failure_is_not_persisted(self):
+        with mock.patch.object(real_world_routing, '_cached_ors_route',
+                               side_effect=requests.exceptions.Timeout('timed out')):
+            distance, route_data = self.router.get_real_distance(self.point1, self.point2)
+
+        self.assertEqual(route_data['provider'], 'Haversine (Fallback)')
+        self.assertGreater(distance, 0)
+        self.assertIsNone(self.store.get(','.join(map(str, _route_key(self.point1, self.point2)))))
+        self.assertEqual(self._stored_rows(), 0)
+
+    def test_ors_result_is_persisted(self):
+        route = (150.0, {'distance': 150.0, 'duration': 180.0, 'geometry': [], 'provider': 'OpenRouteService'})
+        with mock.patch.object(real_world_routing, '_cached_ors_route', return_value=route):
+            self.router.get_real_distance(self.point1, self.point2)
+
+        self.assertEqual(self._stored_rows(), 1)
+
+    def test_fallback_is_retried_after_recovery(self):
+        with mock.patch.object(real_world_routing, '_cached_ors_route',
+                               side_effect=requests.exceptions.Timeout('timed out')):
+            self.router.get_real_distance(self.point1, self.point2)
+        self.assertEqual(self.router.route_cache, {})
+
+        route = (150.0, {'distance': 150.0, 'duration': 180.0, 'geometry': [], 'provider': 'OpenRouteService'})
+        with mock.patch.object(real_world_routing, '_cached_ors_route', return_value=route):
+            distance, route_data = self.router.get_real_distance(self.point1, self.point2)
+
+        self.assertEqual((distance, route_data['provider']), (150.0, 'OpenRouteService'))
+
+
+class MatrixErrorFallbackTest(unittest.TestCase):
+    """Only matrix size-limit rejections fall back to pairwise directions calls"""
+
+    def setUp(self):
+        self.router = RealWorldRouteOptimizer(api_key='test-key')
+        self.router.route_store = None
+        self.waypoints = [{'lat': 13.0827, 'lng': 80.2707},
+                          {'lat': 11.9416, 'lng': 79.8083},
+                          {'lat': 12.9716, 'lng': 77.5946}]
+
+    def _matrix_response(self, status_code):
+        response = requests.Response()
+        response.status_code = status_code
+        response.url = real_world_routing.ORS_MATRIX_URL
+        return response
+
+    def test_forbidden_matrix_makes_no_directions_calls(self):
+        route = (150.0, {'distance': 150.0, 'duration': 180.0, 'geometry': [], 'provider': 'OpenRouteService'})
+        with mock.patch.object(self.router, '_ors_post', return_value=self._matrix_response(403)), \
+                mock.patch.object(real_world_routing, '_cached_ors_route', return_value=route) as directions:
+            with self.assertRaises(requests.HTTPError):
+                self.router.calculate_distance_matrix_real(self.waypoints)
+
+        directions.assert_not_called()
+
+    def test_oversized_matrix_falls_back_to_pairwise(self):
+        route = (150.0, {'distance': 150.0, 'duration': 180.0, 'geometry': [], 'provider': 'OpenRouteService'})
+        with mock.patch.object(self.router, '_ors_post', return_value=self._matrix_response(413)), \
+                mock.patch.object(real_world_routing, '_cached_ors_route', return_value=route) as directions:
+            matrix, _ = self.router.calculate_distance_matrix_real(self.waypoints)
+
+        self.assertTrue(directions.called)
+        self.assertEqual(matrix[0][1], 150.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'quantum'))
+
+from route_optimizer import WhaleOptimizationExploiter
+
+
+class WhaleOptimizationDtypeTest(unittest.TestCase):
+    """WOA positions and costs stay in float32 like the distance matrix"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.distance_matrix = (rng.random((8, 8)) * 100).astype(np.float32)
+
+    def test_positions_stay_float32(self):
+        woa = WhaleOptimizationExploiter(max_iter=20, rng=np.random.default_rng(1))
+        woa.optimize(self.distance_matrix, initial_solution=2)
+
+        self.assertEqual(woa.positions.dtype, np.float32)
+
+    def test_float64_row_sums_do_not_upcast(self):
+        woa = WhaleOptimizationExploiter(max_iter=20, rng=np.random.default_rng(1))
+        woa.optimize(self.distance_matrix, row_sums=self.distance_matrix.sum(axis=1, dtype=np.float64))
+
+        self.assertEqual(woa.positions.dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()